@@ -0,0 +1,335 @@
+import json, math
+import numpy as np
+
+from pdal_kernels import box_mask, polygons_mask, sphere_mask
+from pdal_stream_utils import (
+    DEFAULT_CHUNK_SIZE,
+    CancelToken,
+    JobCancelled,
+    filter_las,
+    install_signal_handlers,
+    parse_wkt_polygons,
+)
+
+# Bu kod, Potree sahnesindeki birden fazla clip volume'ü (box, sphere, polygon prizma)
+# tek geçişte point cloud'a uygular.
+#
+# Semantik Potree shader'ı ile aynıdır (clipTask / clipMethod):
+#   clipMethod "any": nokta herhangi bir volume'ün içindeyse "içeride"
+#   clipMethod "all": nokta tüm volume'lerin içindeyse "içeride"
+#   clipTask "inside":  içerideki noktalar tutulur (SHOW_INSIDE)
+#   clipTask "outside": içerideki noktalar silinir (SHOW_OUTSIDE)
+#
+# Scene JSON:
+#   {
+#     "clipTask": "outside",
+#     "clipMethod": "any",
+#     "volumes": [
+#       {"type": "box", "matrixWorld": [16 eleman, THREE.js column-major]},
+#       {"type": "box", "position": [x, y, z], "scale": [sx, sy, sz], "quaternion": [qx, qy, qz, qw]},
+#       {"type": "sphere", "matrixWorld": [...]} veya {"type": "sphere", "center": [x, y, z], "radius": r},
+#       {"type": "polygon", "points": [[x, y], ...] veya "wkt": "POLYGON(...)", "zmin": z0, "zmax": z1}
+#       (polygon için zmin / zmax opsiyoneldir)
+#       {"type": "screenPolygon", "points": [[ndc_x, ndc_y], ...], "viewProjection": [16 eleman]}
+#       (clipping tool'un ekranda çizilen polygon'u: NDC köşeleri + çizildiği kameranın proj * view'i)
+#     ]
+#   }
+#
+# Box ve sphere için matrixWorld önerilir - Potree de highlight'ı bu matrisin tersi ile yapar
+# (clipBoxes[i] = box.matrixWorld.invert()). Böylece Euler sırası / yön belirsizliği olmaz.
+
+CLIP_TASKS = ("inside", "outside")
+CLIP_METHODS = ("any", "all")
+
+
+def quaternion_to_matrix(qx, qy, qz, qw):
+    """
+    Quaternion'dan rotasyon matrisine dönüşüm
+    THREE.js quaternion formatı: (x, y, z, w)
+    """
+    norm = math.sqrt(qx*qx + qy*qy + qz*qz + qw*qw)
+    if norm > 0:
+        qx, qy, qz, qw = qx/norm, qy/norm, qz/norm, qw/norm
+
+    qx2, qy2, qz2 = qx*qx, qy*qy, qz*qz
+    qxy, qxz, qyz = qx*qy, qx*qz, qy*qz
+    qxw, qyw, qzw = qx*qw, qy*qw, qz*qw
+
+    return np.array([
+        [1 - 2*(qy2 + qz2), 2*(qxy - qzw), 2*(qxz + qyw)],
+        [2*(qxy + qzw), 1 - 2*(qx2 + qz2), 2*(qyz - qxw)],
+        [2*(qxz - qyw), 2*(qyz + qxw), 1 - 2*(qx2 + qy2)]
+    ])
+
+
+def _matrix_world(spec):
+    """
+    Volume'ün 4x4 dünya matrisi (row-major numpy)
+
+    THREE.js Matrix4.elements column-major olduğu için transpoze edilir.
+    matrixWorld yoksa position / scale / quaternion'dan oluşturulur: M = T * R * S
+    """
+    if "matrixWorld" in spec:
+        elements = np.asarray(spec["matrixWorld"], dtype=np.float64)
+        if elements.size != 16:
+            raise ValueError(f"matrixWorld must have 16 elements, got {elements.size}")
+        return elements.reshape(4, 4).T
+
+    position = np.asarray(spec.get("position", [0, 0, 0]), dtype=np.float64)
+    scale = np.asarray(spec.get("scale", [1, 1, 1]), dtype=np.float64)
+    quaternion = spec.get("quaternion", [0, 0, 0, 1])
+
+    M = np.eye(4)
+    M[:3, :3] = quaternion_to_matrix(*quaternion) * scale
+    M[:3, 3] = position
+    return M
+
+
+class _AffineVolume:
+    """
+    Birim şekle (box: [-0.5, 0.5]^3, sphere: yarıçap 1) matrixWorld ile taşınan volume
+
+    Noktalar world -> local dönüşümüyle (matrixWorld^-1) birim şekle göre test edilir.
+    """
+
+    def __init__(self, matrix_world):
+        if abs(np.linalg.det(matrix_world[:3, :3])) < 1e-12:
+            raise ValueError("Clip volume matrix is singular (zero scale?)")
+        inverse = np.linalg.inv(matrix_world)
+        # Kernel'ler contiguous dizi bekler
+        self.linear = np.ascontiguousarray(inverse[:3, :3])
+        self.offset = np.ascontiguousarray(inverse[:3, 3])
+        self.aabb = self._world_aabb(matrix_world)
+
+
+class BoxClip(_AffineVolume):
+
+    def _world_aabb(self, M):
+        corners = np.array([[x, y, z, 1.0] for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)])
+        world = (M @ corners.T).T[:, :3]
+        return world.min(axis=0), world.max(axis=0)
+
+    def contains(self, xyz):
+        return box_mask(xyz, self.linear, self.offset)
+
+
+class SphereClip(_AffineVolume):
+    """Potree SphereVolume - ölçeklenmiş/döndürülmüş olabilir (elipsoid)"""
+
+    def _world_aabb(self, M):
+        # Elipsoid AABB yarı boyutu: lineer kısmın satır normları
+        half = np.sqrt((M[:3, :3] ** 2).sum(axis=1))
+        center = M[:3, 3]
+        return center - half, center + half
+
+    def contains(self, xyz):
+        return sphere_mask(xyz, self.linear, self.offset)
+
+
+class PolygonPrismClip:
+    """PolygonVolume - XY polygon'u, [zmin, zmax] aralığında extrude edilmiş"""
+
+    def __init__(self, polygons, zmin, zmax):
+        if zmax < zmin:
+            zmin, zmax = zmax, zmin
+        self.polygons = polygons
+        self.zmin, self.zmax = zmin, zmax
+        exterior = np.vstack([rings[0] for rings in polygons])
+        self.aabb = (np.array([*exterior.min(axis=0), zmin]), np.array([*exterior.max(axis=0), zmax]))
+
+    def contains(self, xyz):
+        z = xyz[:, 2]
+        inside = (z >= self.zmin) & (z <= self.zmax)
+        idx = np.flatnonzero(inside)
+        inside[idx] = polygons_mask(xyz[idx, 0], xyz[idx, 1], self.polygons)
+        return inside
+
+
+class ScreenPolygonClip:
+    """
+    Potree PolygonClipVolume - ekranda (NDC) çizilen polygon
+
+    Noktalar çizim kamerasının view-projection matrisi ile clip space'e taşınır,
+    perspektif bölmesinden sonra NDC xy'si polygon ile test edilir. Shader'daki
+    pointInClipPolygon ile aynıdır (w işareti kontrol edilmez). World AABB'si yoktur.
+    """
+
+    def __init__(self, ring, view_projection):
+        self.polygons = [[ring]]
+        self.view_projection = view_projection
+        self.aabb = (np.full(3, -np.inf), np.full(3, np.inf))
+
+    def contains(self, xyz):
+        M = self.view_projection
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = xyz @ M[3, :3] + M[3, 3]
+            x = (xyz @ M[0, :3] + M[0, 3]) / w
+            y = (xyz @ M[1, :3] + M[1, 3]) / w
+        return polygons_mask(x, y, self.polygons)
+
+
+def build_volume(spec):
+    """Scene JSON'daki tek bir volume tanımını clip şekline çevir"""
+    kind = spec.get("type")
+    if kind == "box":
+        return BoxClip(_matrix_world(spec))
+
+    if kind == "sphere":
+        if "matrixWorld" not in spec and "center" in spec:
+            r = float(spec["radius"])
+            spec = {"position": spec["center"], "scale": [r, r, r]}
+        return SphereClip(_matrix_world(spec))
+
+    if kind == "polygon":
+        if "wkt" in spec:
+            polygons = parse_wkt_polygons(spec["wkt"])
+        else:
+            ring = np.asarray([p[:2] for p in spec["points"]], dtype=np.float64)
+            if len(ring) < 3:
+                raise ValueError("Polygon clip volume needs at least 3 points")
+            polygons = [[ring]]
+        # zmin/zmax verilmezse sonsuz prizma (2D polygon crop)
+        return PolygonPrismClip(polygons, float(spec.get("zmin", -math.inf)), float(spec.get("zmax", math.inf)))
+
+    if kind == "screenPolygon":
+        ring = np.asarray([p[:2] for p in spec["points"]], dtype=np.float64)
+        if len(ring) < 3:
+            raise ValueError("Screen polygon clip volume needs at least 3 points")
+        elements = np.asarray(spec["viewProjection"], dtype=np.float64)
+        if elements.size != 16:
+            raise ValueError(f"viewProjection must have 16 elements, got {elements.size}")
+        # THREE.js column-major -> row-major
+        return ScreenPolygonClip(ring, elements.reshape(4, 4).T)
+
+    raise ValueError(f"Unsupported clip volume type: {kind} (expected box, sphere, polygon or screenPolygon)")
+
+
+class ClipVolumeSet:
+    """
+    Derlenmiş clip volume seti - chunk başına tek vektörel maske
+
+    Her volume için önce chunk'ın sınırları, sonra noktaların AABB'si ile eleme yapılır;
+    tam test (matris çarpımı / polygon) sadece aday noktalarda çalışır.
+    "any" modunda zaten içeride olan noktalar sonraki volume'lerde tekrar test edilmez,
+    "all" modunda zaten dışarıda olanlar.
+
+    Args:
+        volumes: BoxClip / SphereClip / PolygonPrismClip / ScreenPolygonClip listesi
+        method: "any" veya "all"
+        task: "inside" (içeriyi tut) veya "outside" (içeriyi sil)
+    """
+
+    def __init__(self, volumes, method="any", task="inside"):
+        if not volumes:
+            raise ValueError("Clip volume set is empty")
+        if method not in CLIP_METHODS:
+            raise ValueError(f"Unsupported clip method: {method} (expected one of {CLIP_METHODS})")
+        if task not in CLIP_TASKS:
+            raise ValueError(f"Unsupported clip task: {task} (expected one of {CLIP_TASKS})")
+        self.volumes = volumes
+        self.method = method
+        self.task = task
+
+    @classmethod
+    def from_scene(cls, scene):
+        volumes = [build_volume(spec) for spec in scene.get("volumes", [])]
+        return cls(volumes, scene.get("clipMethod", "any"), scene.get("clipTask", "inside"))
+
+    def inside_mask(self, xyz):
+        n = len(xyz)
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+
+        chunk_min = xyz.min(axis=0)
+        chunk_max = xyz.max(axis=0)
+        inside = np.zeros(n, dtype=bool) if self.method == "any" else np.ones(n, dtype=bool)
+
+        for volume in self.volumes:
+            vmin, vmax = volume.aabb
+            # Chunk seviyesinde eleme: kesişme yoksa bu volume hiçbir noktayı içermez
+            if np.any(chunk_max < vmin) or np.any(chunk_min > vmax):
+                if self.method == "all":
+                    inside[:] = False
+                    break
+                continue
+
+            # Test edilmesi gereken noktalar: "any" için henüz dışarıda, "all" için henüz içeride
+            pending = ~inside if self.method == "any" else inside
+            idx = np.flatnonzero(pending)
+            if len(idx) == 0:
+                if self.method == "any":
+                    break
+                continue
+
+            sub = xyz[idx]
+            in_aabb = np.all((sub >= vmin) & (sub <= vmax), axis=1)
+            candidates = idx[in_aabb]
+            result = np.zeros(len(idx), dtype=bool)
+            if len(candidates):
+                result[in_aabb] = volume.contains(xyz[candidates])
+            inside[idx] = result
+
+        return inside
+
+    def keep_mask(self, xyz):
+        inside = self.inside_mask(xyz)
+        return inside if self.task == "inside" else ~inside
+
+
+def _chunk_xyz(chunk):
+    return np.column_stack([chunk.x, chunk.y, chunk.z])
+
+
+def apply_clip_volumes(input_file, output_file, scene, chunk_size=DEFAULT_CHUNK_SIZE, token=None):
+    """
+    Clip volume setini tek geçişte uygula
+
+    Args:
+        input_file: Giriş LAS/LAZ dosyası
+        output_file: Çıkış LAS/LAZ dosyası
+        scene: Scene sözlüğü veya JSON dosya yolu
+        chunk_size: Tek seferde okunacak nokta sayısı
+        token: İptal kontrolü için CancelToken (opsiyonel)
+    """
+    if isinstance(scene, str):
+        with open(scene, "r", encoding="utf-8") as f:
+            scene = json.load(f)
+
+    clip_set = ClipVolumeSet.from_scene(scene)
+
+    print("=" * 60)
+    print("Clip volumes:")
+    print(f"  Volumes: {len(clip_set.volumes)} ({', '.join(type(v).__name__ for v in clip_set.volumes)})")
+    print(f"  Method:  inside {clip_set.method}")
+    print(f"  Task:    keep {clip_set.task}")
+    print("=" * 60)
+
+    read, written = filter_las(input_file, output_file, lambda chunk: clip_set.keep_mask(_chunk_xyz(chunk)),
+                               chunk_size, label="Applying clip volumes", token=token)
+
+    print(f"  Points removed: {read - written:,}")
+    print(f"  Points kept:    {written:,}")
+    print(f"✓ Clip volumes applied successfully: {output_file}")
+    return read, written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Clip volumes - box / sphere / polygon setini tek geçişte uygula")
+    parser.add_argument("--run", required=True, choices=["clipVolumes"])
+    parser.add_argument("--i", required=True, type=str, help="Input LAZ file")
+    parser.add_argument("--o", required=True, type=str, help="Output LAZ file")
+    parser.add_argument("--scene", required=True, type=str, help="Clip volume scene JSON file")
+    parser.add_argument("--chunk", required=False, type=int, default=DEFAULT_CHUNK_SIZE, help="Points per chunk")
+    parser.add_argument("--cancel", required=False, type=str, help="Cancel file (job is cancelled when it exists)")
+
+    args = parser.parse_args()
+
+    token = CancelToken([args.cancel])
+    install_signal_handlers(token.cancel)
+    try:
+        apply_clip_volumes(args.i, args.o, args.scene, args.chunk, token=token)
+    except JobCancelled:
+        print("[INFO]: Clip volumes cancelled, partial output removed")
+        raise SystemExit(1)
@@ -0,0 +1,232 @@
+import json, os, time
+import numpy as np
+
+from pdal_clip_volumes import ClipVolumeSet
+from pdal_stream_utils import (
+    DEFAULT_CHUNK_SIZE,
+    CancelToken,
+    JobCancelled,
+    atomic_output,
+    filter_las,
+    install_signal_handlers,
+    print_result,
+)
+
+# Point cloud düzenleme günlüğü (edit journal).
+#
+# Her silme / kırpma yeni bir LAZ yazmak yerine point cloud'un yanındaki
+# "<cloud>.edits.json" dosyasına bir kayıt olarak eklenir. "journalApply"
+# tüm kayıtları tek geçişte uygular (export / kaydetme sırasında).
+# Geri alma (undo) sadece kaydı silmektir, point cloud'a dokunulmaz.
+#
+# Kayıt formatı (volume tanımları pdal_clip_volumes ile aynı):
+#   {"id": 3, "op": "delete", "clipMethod": "any", "volumes": [...], "created": "..."}
+#
+#   op "delete": volume(ler) içindeki noktalar silinir  (clipTask "outside")
+#   op "crop":   volume(ler) dışındaki noktalar silinir (clipTask "inside")
+#
+# Her işlem sadece nokta siler; bu yüzden sıralı uygulama ile tek geçişte
+# "tüm kayıtların tuttuğu noktalar" (maskelerin AND'i) aynı sonucu verir.
+
+OPERATIONS = {"delete": "outside", "crop": "inside"}
+
+
+def journal_path(cloud_file):
+    """Point cloud'un yanındaki journal dosyası"""
+    return cloud_file + ".edits.json"
+
+
+def load_journal(cloud_file):
+    path = journal_path(cloud_file)
+    if not os.path.exists(path):
+        return {"source": os.path.basename(cloud_file), "entries": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_journal(cloud_file, journal):
+    with atomic_output(journal_path(cloud_file)) as tmp:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(journal, f, indent=2)
+
+
+def append_entry(cloud_file, op, volumes, clip_method="any"):
+    """
+    Journal'a silme / kırpma kaydı ekle
+
+    Args:
+        cloud_file: Point cloud dosyası
+        op: "delete" veya "crop"
+        volumes: Volume tanımları (pdal_clip_volumes scene formatı)
+        clip_method: "any" veya "all"
+
+    Returns:
+        Eklenen kayıt
+    """
+    if op not in OPERATIONS:
+        raise ValueError(f"Unsupported journal operation: {op} (expected one of {sorted(OPERATIONS)})")
+
+    entry = {"op": op, "clipMethod": clip_method, "volumes": volumes}
+    # Kaydı eklemeden önce doğrula - bozuk kayıt apply sırasında patlamasın
+    _entry_clip_set(entry)
+
+    journal = load_journal(cloud_file)
+    entry["id"] = max((e["id"] for e in journal["entries"]), default=0) + 1
+    entry["created"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    journal["entries"].append(entry)
+    save_journal(cloud_file, journal)
+
+    print(f"✓ Journal entry added: #{entry['id']} {op} ({len(volumes)} volume(s))")
+    return entry
+
+
+def undo_entries(cloud_file, count=1, entry_id=None):
+    """
+    Son count kaydı (veya entry_id verilirse sadece o kaydı) journal'dan çıkar
+
+    Returns:
+        Çıkarılan kayıtlar
+    """
+    journal = load_journal(cloud_file)
+    entries = journal["entries"]
+
+    if entry_id is not None:
+        removed = [e for e in entries if e["id"] == entry_id]
+        if not removed:
+            raise ValueError(f"Journal entry not found: #{entry_id}")
+        journal["entries"] = [e for e in entries if e["id"] != entry_id]
+    else:
+        count = max(0, min(count, len(entries)))
+        removed = entries[len(entries) - count:]
+        journal["entries"] = entries[:len(entries) - count]
+
+    save_journal(cloud_file, journal)
+    for entry in removed:
+        print(f"  Removed journal entry: #{entry['id']} {entry['op']}")
+    return removed
+
+
+def clear_journal(cloud_file):
+    path = journal_path(cloud_file)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _entry_clip_set(entry):
+    scene = {"clipTask": OPERATIONS[entry["op"]], "clipMethod": entry.get("clipMethod", "any"),
+             "volumes": entry["volumes"]}
+    return ClipVolumeSet.from_scene(scene)
+
+
+def apply_journal(cloud_file, output_file=None, chunk_size=DEFAULT_CHUNK_SIZE, token=None):
+    """
+    Journal'daki tüm kayıtları tek geçişte uygula
+
+    Args:
+        cloud_file: Point cloud dosyası
+        output_file: Çıkış dosyası. None ise point cloud'un kendisi (atomik olarak)
+            yeniden yazılır ve uygulanan kayıtlar journal'dan çıkarılır.
+        chunk_size: Tek seferde okunacak nokta sayısı
+        token: İptal kontrolü için CancelToken (opsiyonel)
+
+    Returns:
+        (points_read, points_written)
+    """
+    journal = load_journal(cloud_file)
+    entries = journal["entries"]
+    in_place = output_file is None or os.path.abspath(output_file) == os.path.abspath(cloud_file)
+
+    print("=" * 60)
+    print("Edit journal:")
+    print(f"  Cloud:   {cloud_file}")
+    print(f"  Entries: {len(entries)}")
+    for entry in entries:
+        print(f"    #{entry['id']} {entry['op']} ({len(entry['volumes'])} volume(s))")
+    print("=" * 60)
+
+    if not entries:
+        print("[INFO]: Journal is empty, nothing to apply")
+        return 0, 0
+
+    clip_sets = [_entry_clip_set(entry) for entry in entries]
+
+    def keep_fn(chunk):
+        xyz = np.column_stack([chunk.x, chunk.y, chunk.z])
+        keep = np.ones(len(xyz), dtype=bool)
+        for clip_set in clip_sets:
+            # Önceki kayıtların sildiği noktalar tekrar test edilmez
+            idx = np.flatnonzero(keep)
+            if len(idx) == 0:
+                break
+            keep[idx] = clip_set.keep_mask(xyz[idx])
+        return keep
+
+    target = cloud_file if in_place else output_file
+    read, written = filter_las(cloud_file, target, keep_fn, chunk_size, label="Applying edit journal", token=token)
+
+    if in_place:
+        # Geçiş sırasında eklenen kayıtlar henüz uygulanmadı - sadece uygulananları çıkar
+        applied = {entry["id"] for entry in entries}
+        journal = load_journal(cloud_file)
+        journal["entries"] = [e for e in journal["entries"] if e["id"] not in applied]
+        save_journal(cloud_file, journal)
+        if journal["entries"]:
+            print(f"[INFO]: {len(journal['entries'])} journal entry(s) added during apply are kept")
+
+    print(f"  Points removed: {read - written:,}")
+    print(f"  Points kept:    {written:,}")
+    print(f"✓ Edit journal applied successfully: {target}")
+    return read, written
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Edit journal - silme/kırpma işlemlerini biriktir, tek geçişte uygula")
+    parser.add_argument("--run", required=True,
+                        choices=["journalAppend", "journalUndo", "journalList", "journalApply", "journalClear"])
+    parser.add_argument("--i", required=True, type=str, help="Point cloud (LAS/LAZ) the journal belongs to")
+    parser.add_argument("--o", required=False, type=str, help="Output file (journalApply, default: rewrite input)")
+
+    # journalAppend
+    parser.add_argument("--op", required=False, type=str, choices=sorted(OPERATIONS), help="Operation")
+    parser.add_argument("--scene", required=False, type=str, help="Clip volume scene JSON (volumes, clipMethod)")
+    parser.add_argument("--wkt", required=False, type=str, help="2D polygon WKT instead of --scene")
+
+    # journalUndo
+    parser.add_argument("--count", required=False, type=int, default=1, help="Number of entries to undo")
+    parser.add_argument("--id", required=False, type=int, help="Undo a specific entry")
+
+    parser.add_argument("--chunk", required=False, type=int, default=DEFAULT_CHUNK_SIZE, help="Points per chunk")
+    parser.add_argument("--cancel", required=False, type=str, help="Cancel file (job is cancelled when it exists)")
+
+    args = parser.parse_args()
+
+    if args.run == "journalAppend":
+        if not args.op or not (args.scene or args.wkt):
+            parser.error("journalAppend requires --op and --scene or --wkt")
+        if args.scene:
+            with open(args.scene, "r", encoding="utf-8") as f:
+                scene = json.load(f)
+            append_entry(args.i, args.op, scene["volumes"], scene.get("clipMethod", "any"))
+        else:
+            append_entry(args.i, args.op, [{"type": "polygon", "wkt": args.wkt.strip('"')}])
+
+    elif args.run == "journalUndo":
+        undo_entries(args.i, args.count, args.id)
+
+    elif args.run == "journalList":
+        print_result(json.dumps(load_journal(args.i)["entries"]))
+
+    elif args.run == "journalClear":
+        clear_journal(args.i)
+        print(f"✓ Edit journal cleared: {journal_path(args.i)}")
+
+    elif args.run == "journalApply":
+        token = CancelToken([args.cancel])
+        install_signal_handlers(token.cancel)
+        try:
+            apply_journal(args.i, args.o, args.chunk, token=token)
+        except JobCancelled:
+            print("[INFO]: Edit journal apply cancelled, partial output removed")
+            raise SystemExit(1)
@@ -0,0 +1,394 @@
+import json, math, os
+from contextlib import contextmanager
+import numpy as np
+
+from pdal_kernels import max_z_in_polygons
+from pdal_stream_utils import (
+    DEFAULT_CHUNK_SIZE,
+    CancelToken,
+    JobCancelled,
+    atomic_output,
+    partial_path,
+    grid_shape,
+    install_signal_handlers,
+    iter_las_chunks,
+    parse_wkt_polygons,
+    points_in_polygons,
+    polygons_bounds,
+    print_progress,
+    print_result,
+    read_header_bounds,
+)
+
+# Bu kod, LAS/LAZ dosyasını tek geçişte okuyup max-Z / min-Z / count raster'ı (DSM) üretir.
+# Çıktı GeoTIFF (.tif) veya memory-map ile açılabilen .npy grid olabilir.
+# .npy için yanına "<çıktı>.json" (origin, çözünürlük, nodata) yazılır; 2D harita
+# ve rasterMaxZInPolygon bu bilgiyi kullanır.
+#
+# Grid düzeni (GeoTIFF ile aynı, kuzey yukarı):
+#   satır 0 = ymax, sütun 0 = xmin
+#   col = floor((x - xmin) / res), row = floor((ymax - y) / res)
+
+STATS = ("max", "min", "count")
+
+
+def raster_metadata_path(raster_file):
+    """.npy grid'in yanındaki metadata dosyası"""
+    return raster_file + ".json"
+
+
+def _cell_indices(x, y, xmin, ymax, resolution, rows, cols):
+    """Noktaların grid içindeki düz (flat) indeksleri"""
+    col = np.floor((x - xmin) / resolution).astype(np.int64)
+    row = np.floor((ymax - y) / resolution).astype(np.int64)
+    # Sınırdaki noktalar (x == xmax, y == ymin) son hücreye düşsün
+    np.clip(col, 0, cols - 1, out=col)
+    np.clip(row, 0, rows - 1, out=row)
+    return row * cols + col
+
+
+def _bin_chunk(flat_grid, flat_idx, z, stat):
+    """
+    Bir chunk'ı grid'e işle - hücre başına tek güncelleme
+
+    np.maximum.at yerine sıralama + reduceat kullanılır (çok daha hızlı).
+    """
+    if len(flat_idx) == 0:
+        return
+
+    if stat == "count":
+        cells, counts = np.unique(flat_idx, return_counts=True)
+        flat_grid[cells] += counts.astype(flat_grid.dtype)
+        return
+
+    order = np.argsort(flat_idx, kind="stable")
+    idx_sorted = flat_idx[order]
+    z_sorted = z[order]
+    cells, starts = np.unique(idx_sorted, return_index=True)
+
+    if stat == "max":
+        values = np.maximum.reduceat(z_sorted, starts)
+        # NaN (nodata) hücrelerde fmax yeni değeri alır
+        flat_grid[cells] = np.fmax(flat_grid[cells], values)
+    else:
+        values = np.minimum.reduceat(z_sorted, starts)
+        flat_grid[cells] = np.fmin(flat_grid[cells], values)
+
+
+def _write_geotiff(output_file, grid, xmin, ymax, resolution, nodata, crs_wkt, stat):
+    try:
+        import rasterio
+        from rasterio.transform import from_origin
+        from rasterio.windows import Window
+    except ImportError:
+        raise ImportError("'rasterio' library not found! Install it with: pip install rasterio "
+                          "(or use a .npy output instead)")
+
+    profile = {
+        "driver": "GTiff",
+        "height": grid.shape[0],
+        "width": grid.shape[1],
+        "count": 1,
+        "dtype": grid.dtype.name,
+        "transform": from_origin(xmin, ymax, resolution, resolution),
+        "nodata": nodata,
+        "compress": "deflate",
+        "tiled": True,
+    }
+    if crs_wkt:
+        profile["crs"] = crs_wkt
+
+    with rasterio.open(output_file, "w", **profile) as dst:
+        dst.update_tags(STAT=stat)
+        # Satır blokları halinde yaz (büyük grid'ler için bellek sınırlı kalsın)
+        block_rows = max(1, (64 * 1024 * 1024) // max(1, grid.shape[1] * grid.dtype.itemsize))
+        for row in range(0, grid.shape[0], block_rows):
+            window = Window(0, row, grid.shape[1], min(block_rows, grid.shape[0] - row))
+            dst.write(np.asarray(grid[row:row + window.height]), 1, window=window)
+
+
+def _header_crs_wkt(input_file):
+    try:
+        import laspy
+        with laspy.open(input_file) as reader:
+            crs = reader.header.parse_crs()
+            return crs.to_wkt() if crs is not None else None
+    except Exception:
+        return None
+
+
+def elevation_raster(input_file, output_file, resolution, stat="max", chunk_size=DEFAULT_CHUNK_SIZE, token=None):
+    """
+    Point cloud'u tek geçişte max-Z / min-Z / count raster'ına dönüştür
+
+    Args:
+        input_file: Giriş LAS/LAZ dosyası
+        output_file: Çıkış dosyası (.tif veya .npy)
+        resolution: Hücre boyutu (point cloud birimi)
+        stat: "max", "min" veya "count"
+        chunk_size: Tek seferde okunacak nokta sayısı
+        token: İptal kontrolü için CancelToken (opsiyonel)
+
+    Returns:
+        Metadata sözlüğü (origin, çözünürlük, boyut, nodata)
+    """
+    if stat not in STATS:
+        raise ValueError(f"Unsupported stat: {stat} (expected one of {STATS})")
+    if resolution <= 0:
+        raise ValueError(f"Resolution must be positive: {resolution}")
+
+    extension = os.path.splitext(output_file)[1].lower()
+    if extension not in (".tif", ".tiff", ".npy"):
+        raise ValueError(f"Unsupported output format: {extension} (expected .tif or .npy)")
+
+    point_count, mins, maxs = read_header_bounds(input_file)
+    xmin, ymin = mins[0], mins[1]
+    xmax, ymax = maxs[0], maxs[1]
+    rows, cols = grid_shape(xmin, ymin, xmax, ymax, resolution)
+
+    print("=" * 60)
+    print("Elevation raster:")
+    print(f"  Input:  {input_file} ({point_count:,} points)")
+    print(f"  Stat:   {stat}")
+    print(f"  Grid:   {cols} x {rows} cells @ {resolution}")
+    print(f"  Origin: ({xmin:.3f}, {ymax:.3f})")
+    print("=" * 60)
+
+    if stat == "count":
+        dtype, nodata = np.uint32, 0
+    else:
+        dtype, nodata = np.float32, float("nan")
+
+    metadata = {
+        "stat": stat,
+        "xmin": float(xmin),
+        "ymax": float(ymax),
+        "resolution": float(resolution),
+        "rows": rows,
+        "cols": cols,
+        "nodata": "nan" if stat != "count" else 0,
+        "source": os.path.abspath(input_file),
+        "crs": _header_crs_wkt(input_file),
+    }
+
+    def bin_points(grid_file):
+        # Grid her zaman diskte bir .npy memmap olarak oluşturulur - RAM yerine sayfa önbelleği
+        grid = np.lib.format.open_memmap(grid_file, mode="w+", dtype=dtype, shape=(rows, cols))
+        grid[:] = nodata
+        flat_grid = grid.reshape(-1)
+        for chunk, done, total in iter_las_chunks(input_file, chunk_size, label="Binning points", token=token):
+            x = np.asarray(chunk.x)
+            y = np.asarray(chunk.y)
+            flat_idx = _cell_indices(x, y, xmin, ymax, resolution, rows, cols)
+            z = np.asarray(chunk.z, dtype=np.float32) if stat != "count" else None
+            _bin_chunk(flat_grid, flat_idx, z, stat)
+        grid.flush()
+        # Memmap kapatılmadan dosya taşınamaz/silinemez (Windows)
+        del grid, flat_grid
+
+    if extension == ".npy":
+        with atomic_output(output_file) as grid_file:
+            bin_points(grid_file)
+        with atomic_output(raster_metadata_path(output_file)) as metadata_file:
+            with open(metadata_file, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2)
+    else:
+        grid_file = partial_path(output_file + ".npy")
+        grid = None
+        try:
+            bin_points(grid_file)
+            print_progress("Writing GeoTIFF", 100.0)
+            grid = np.load(grid_file, mmap_mode="r")
+            with atomic_output(output_file) as tif_file:
+                _write_geotiff(tif_file, grid, xmin, ymax, resolution, nodata, metadata["crs"], stat)
+        finally:
+            grid = None
+            if os.path.exists(grid_file):
+                os.remove(grid_file)
+
+    print(f"✓ Elevation raster created successfully: {output_file}")
+    return metadata
+
+
+@contextmanager
+def open_raster(raster_file):
+    """
+    rasterMaxZInPolygon için raster'ı aç (.npy memmap veya GeoTIFF)
+
+    Raster belleğe okunmaz; read_window(r0, r1, c0, c1) sadece istenen pencereyi
+    (satır/sütun dahil) float64 olarak, nodata hücreleri NaN olacak şekilde döndürür.
+
+    Yields:
+        (shape, xmin, ymax, resolution, stat, read_window)
+    """
+    extension = os.path.splitext(raster_file)[1].lower()
+    if extension == ".npy":
+        with open(raster_metadata_path(raster_file), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        grid = np.load(raster_file, mmap_mode="r")
+
+        def read_window(r0, r1, c0, c1):
+            return np.asarray(grid[r0:r1 + 1, c0:c1 + 1], dtype=np.float64)
+
+        try:
+            yield grid.shape, metadata["xmin"], metadata["ymax"], metadata["resolution"], metadata["stat"], read_window
+        finally:
+            del grid
+        return
+
+    try:
+        import rasterio
+        from rasterio.windows import Window
+    except ImportError:
+        raise ImportError("'rasterio' library not found! Install it with: pip install rasterio")
+
+    with rasterio.open(raster_file) as src:
+        transform = src.transform
+
+        def read_window(r0, r1, c0, c1):
+            window = Window(c0, r0, c1 - c0 + 1, r1 - r0 + 1)
+            return src.read(1, window=window, masked=True).astype(np.float64).filled(np.nan)
+
+        yield (src.height, src.width), transform.c, transform.f, transform.a, src.tags().get("STAT", "max"), read_window
+
+
+def _slab(p, d, lo, hi):
+    """Segment p + t * d için [lo, hi] aralığına giriş / çıkış t değerleri (hücre başına)"""
+    if d == 0:
+        inside = (lo <= p) & (p <= hi)
+        return np.where(inside, -np.inf, np.inf), np.where(inside, np.inf, -np.inf)
+    t_lo = (lo - p) / d
+    t_hi = (hi - p) / d
+    return np.minimum(t_lo, t_hi), np.maximum(t_lo, t_hi)
+
+
+def _touched_cells(polygons, xmin, ymax, resolution, r0, r1, c0, c1):
+    """
+    Pencerede polygon(lar)ın değdiği hücreler
+
+    Hücre, köşelerinden biri polygon içindeyse veya bir ring kenarı hücreyi
+    kesiyorsa (Liang-Barsky) değer. Hücreden dar polygon'lar da en az bir hücreye düşer.
+    """
+    # Hücre kenarları: sütun j -> [ex[j], ex[j + 1]], satır i -> [ey[i + 1], ey[i]]
+    ex = xmin + np.arange(c0, c1 + 2) * resolution
+    ey = ymax - np.arange(r0, r1 + 2) * resolution
+
+    gx, gy = np.meshgrid(ex, ey)
+    corners = points_in_polygons(gx.ravel(), gy.ravel(), polygons).reshape(gx.shape)
+    touched = corners[:-1, :-1] | corners[:-1, 1:] | corners[1:, :-1] | corners[1:, 1:]
+
+    rows, cols = touched.shape
+    for rings in polygons:
+        for ring in rings:
+            for (ax, ay), (bx, by) in zip(ring, np.roll(ring, -1, axis=0)):
+                # Sadece kenarın AABB'sine denk gelen alt pencere test edilir
+                j0 = max(0, int(math.floor((min(ax, bx) - xmin) / resolution)) - c0)
+                j1 = min(cols - 1, int(math.floor((max(ax, bx) - xmin) / resolution)) - c0)
+                i0 = max(0, int(math.floor((ymax - max(ay, by)) / resolution)) - r0)
+                i1 = min(rows - 1, int(math.floor((ymax - min(ay, by)) / resolution)) - r0)
+                if j0 > j1 or i0 > i1:
+                    continue
+
+                tx0, tx1 = _slab(ax, bx - ax, ex[j0:j1 + 1], ex[j0 + 1:j1 + 2])
+                ty0, ty1 = _slab(ay, by - ay, ey[i0 + 1:i1 + 2], ey[i0:i1 + 1])
+                t0 = np.maximum(np.maximum(tx0[None, :], ty0[:, None]), 0.0)
+                t1 = np.minimum(np.minimum(tx1[None, :], ty1[:, None]), 1.0)
+                touched[i0:i1 + 1, j0:j1 + 1] |= t0 <= t1
+
+    return touched
+
+
+def raster_max_z_in_polygon(raster_file, wkt):
+    """
+    Polygon içindeki maksimum Z değerini raster'dan oku (point cloud taranmaz)
+
+    Polygon'un değdiği tüm hücreler dikkate alınır; sonuç polygon içindeki
+    noktaların max Z'si için raster çözünürlüğünde bir üst sınırdır.
+    """
+    polygons = parse_wkt_polygons(wkt)
+    pxmin, pymin, pxmax, pymax = polygons_bounds(polygons)
+
+    with open_raster(raster_file) as (shape, xmin, ymax, resolution, stat, read_window):
+        if stat != "max":
+            raise ValueError(f"Raster stat is '{stat}', a 'max' raster is required")
+        rows, cols = shape
+
+        # Sadece polygon'un AABB'sine denk gelen pencere okunur
+        c0 = max(0, int(math.floor((pxmin - xmin) / resolution)))
+        c1 = min(cols - 1, int(math.floor((pxmax - xmin) / resolution)))
+        r0 = max(0, int(math.floor((ymax - pymax) / resolution)))
+        r1 = min(rows - 1, int(math.floor((ymax - pymin) / resolution)))
+        if c0 > c1 or r0 > r1:
+            return None
+
+        window = read_window(r0, r1, c0, c1)
+
+    mask = _touched_cells(polygons, xmin, ymax, resolution, r0, r1, c0, c1)
+    values = window[mask & ~np.isnan(window)]
+    if len(values) == 0:
+        return None
+    return float(values.max())
+
+
+def max_z_in_polygon(input_file, wkt, chunk_size=DEFAULT_CHUNK_SIZE, token=None):
+    """
+    Polygon içindeki maksimum Z değerini point cloud'u tarayarak bul (raster yoksa)
+
+    Her chunk önce polygon'un AABB'si ile elenir, kalan noktalarda polygon testi
+    ve max tek geçişte yapılır (Numba varsa geçici dizi olmadan).
+    """
+    polygons = parse_wkt_polygons(wkt)
+    pxmin, pymin, pxmax, pymax = polygons_bounds(polygons)
+
+    best = -np.inf
+    for chunk, done, total in iter_las_chunks(input_file, chunk_size, label="Scanning points", token=token):
+        x = np.asarray(chunk.x)
+        y = np.asarray(chunk.y)
+        idx = np.flatnonzero((x >= pxmin) & (x <= pxmax) & (y >= pymin) & (y <= pymax))
+        if len(idx) == 0:
+            continue
+        best = max(best, max_z_in_polygons(x[idx], y[idx], np.asarray(chunk.z)[idx], polygons))
+
+    return None if best == -np.inf else float(best)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Elevation raster - LAS/LAZ'dan max-Z / min-Z / count grid")
+    parser.add_argument("--run", required=True, choices=["elevationRaster", "rasterMaxZInPolygon", "maxZInPolygon"])
+
+    parser.add_argument("--i", required=False, type=str, help="Input LAZ file (elevationRaster, maxZInPolygon)")
+    parser.add_argument("--o", required=False, type=str, help="Output raster (.tif or .npy)")
+    parser.add_argument("--resolution", required=False, type=float, default=1.0, help="Cell size")
+    parser.add_argument("--stat", required=False, type=str, default="max", choices=STATS)
+    parser.add_argument("--chunk", required=False, type=int, default=DEFAULT_CHUNK_SIZE, help="Points per chunk")
+    parser.add_argument("--cancel", required=False, type=str, help="Cancel file (job is cancelled when it exists)")
+
+    parser.add_argument("--raster", required=False, type=str, help="Raster file (rasterMaxZInPolygon)")
+    parser.add_argument("--wkt", required=False, type=str, help="Polygon WKT (rasterMaxZInPolygon, maxZInPolygon)")
+
+    args = parser.parse_args()
+
+    if args.run == "elevationRaster":
+        if not args.i or not args.o:
+            parser.error("elevationRaster requires --i and --o")
+        token = CancelToken([args.cancel])
+        install_signal_handlers(token.cancel)
+        try:
+            elevation_raster(args.i, args.o, args.resolution, args.stat, args.chunk, token=token)
+        except JobCancelled:
+            print("[INFO]: Elevation raster cancelled, partial output removed")
+            raise SystemExit(1)
+
+    elif args.run == "rasterMaxZInPolygon":
+        if not args.raster or not args.wkt:
+            parser.error("rasterMaxZInPolygon requires --raster and --wkt")
+        result = raster_max_z_in_polygon(args.raster, args.wkt)
+        print_result("nan" if result is None else f"{result:.6f}")
+
+    elif args.run == "maxZInPolygon":
+        if not args.i or not args.wkt:
+            parser.error("maxZInPolygon requires --i and --wkt")
+        result = max_z_in_polygon(args.i, args.wkt, args.chunk)
+        print_result("nan" if result is None else f"{result:.6f}")
@@ -0,0 +1,456 @@
+import heapq, itertools, json, math, os, threading, time
+
+from pdal_kernels import init_threading
+from pdal_stream_utils import (
+    DEFAULT_CHUNK_SIZE,
+    CancelToken,
+    JobCancelled,
+    grid_shape,
+    install_signal_handlers,
+    print_result,
+    read_header_bounds,
+)
+
+# Point cloud komutları için işbirlikçi (cooperative) iş kuyruğu.
+#
+# - İptal: Her komut chunk'lar arasında token.check() çağırır. İptal edilen iş
+#   yarım çıktı bırakmaz (atomic_output geçici dosyayı siler).
+# - Eşzamanlılık: Aynı anda en fazla max_jobs iş ve toplam memory_mb bellek.
+# - Öncelik: "interactive" sorgular (max-Z vb.) "batch" export'lardan önce başlar.
+#   Job'da priority verilmezse komutun varsayılanı (DEFAULT_PRIORITIES) kullanılır.
+# - Sonuç: [RESULT] satırı her iş için {"status", "result", "error"} içerir.
+#
+# İptal için process'i öldürmek yerine "<cancel_dir>/<job_id>.cancel" (veya tüm
+# işler için "<cancel_dir>/all.cancel") dosyası oluşturulur.
+#
+# Kapsam: Sınırlar tek bir runner process'i (tek --jobs dosyası) içindeki işler
+# için geçerlidir; ayrı başlatılan komutlar birbirini görmez. Electron tarafı
+# (ShellCommandService) henüz runner'ı ve cancel dosyalarını kullanmıyor.
+#
+# pdalCrop / pdalRotatedCrop (PotreeService.cropPointCloud argümanları) ve
+# pdalVolumeDelete (pdalVolumeDelete CLI argümanları) clipVolumes üzerinden
+# çalışır (chunk'lar arası iptal kontrolü ve atomik çıktı ile).
+
+PRIORITIES = {"interactive": 0, "batch": 10}
+
+# Sonucu kullanıcının beklediği sorgular - priority verilmezse öne alınır
+DEFAULT_PRIORITIES = {
+    "rasterMaxZInPolygon": "interactive",
+    "maxZInPolygon": "interactive",
+}
+
+# Chunk başına tahmini bellek (x/y/z float64 + maske + geçici diziler + laspy kaydı)
+BYTES_PER_POINT = 160
+
+# outlierRemoval: tile noktası başına KD-tree belleği (TILE_RECORD + cKDTree veri/index/node)
+KDTREE_BYTES_PER_POINT = 96
+
+
+def _run_elevation_raster(args, token):
+    from pdal_elevation_raster import elevation_raster
+    return elevation_raster(args["i"], args["o"], float(args.get("resolution", 1.0)),
+                            args.get("stat", "max"), int(args.get("chunk", DEFAULT_CHUNK_SIZE)),
+                            token=token)
+
+
+def _run_raster_max_z_in_polygon(args, token):
+    from pdal_elevation_raster import raster_max_z_in_polygon
+    return raster_max_z_in_polygon(args["raster"], args["wkt"])
+
+
+def _run_max_z_in_polygon(args, token):
+    from pdal_elevation_raster import max_z_in_polygon
+    return max_z_in_polygon(args["i"], args["wkt"], int(args.get("chunk", DEFAULT_CHUNK_SIZE)), token=token)
+
+
+def _run_clip_volumes(args, token):
+    from pdal_clip_volumes import apply_clip_volumes
+    return apply_clip_volumes(args["i"], args["o"], args["scene"], int(args.get("chunk", DEFAULT_CHUNK_SIZE)),
+                              token=token)
+
+
+def _run_clip_scene(args, token, volume, task):
+    from pdal_clip_volumes import apply_clip_volumes
+    scene = {"clipTask": task, "clipMethod": "any", "volumes": [volume]}
+    return apply_clip_volumes(args["i"], args["o"], scene, int(args.get("chunk", DEFAULT_CHUNK_SIZE)), token=token)
+
+
+def _euler_zyx_to_quaternion(yaw, pitch, roll):
+    """THREE.js Euler "ZYX" sırası (derece) -> quaternion (x, y, z, w)"""
+    cy, sy = math.cos(math.radians(yaw) / 2), math.sin(math.radians(yaw) / 2)
+    cp, sp = math.cos(math.radians(pitch) / 2), math.sin(math.radians(pitch) / 2)
+    cr, sr = math.cos(math.radians(roll) / 2), math.sin(math.radians(roll) / 2)
+    return [
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+        cr * cp * cy + sr * sp * sy,
+    ]
+
+
+def _run_crop(args, token):
+    # PotreeService.cropPointCloud (polygon): --wkt, --mode inside/outside
+    volume = {"type": "polygon", "wkt": args["wkt"]}
+    return _run_clip_scene(args, token, volume, args.get("mode", "inside"))
+
+
+def _run_rotated_crop(args, token):
+    # PotreeService.cropPointCloud (cube): merkez, boyut ve ZYX Euler açıları (derece)
+    volume = {
+        "type": "box",
+        "position": [float(args["cx"]), float(args["cy"]), float(args["cz"])],
+        "scale": [float(args["sx"]), float(args["sy"]), float(args["sz"])],
+        "quaternion": _euler_zyx_to_quaternion(float(args.get("yaw", 0)), float(args.get("pitch", 0)),
+                                               float(args.get("roll", 0))),
+    }
+    return _run_clip_scene(args, token, volume, args.get("mode", "inside"))
+
+
+def _volume_delete_box(args):
+    """
+    pdalVolumeDelete argümanlarından box spec'i - CLI'daki üç rotasyon biçimi:
+
+    1) Quaternion: qx, qy, qz, qw
+    2) Rotasyon matrisi: rm00 ... rm22 (THREE.js column-major; rm0* ilk sütun).
+       Birim matris gelirse ve Euler açıları varsa Euler kullanılır.
+    3) Euler açıları (radyan): roll, pitch, yaw - R = Rz(yaw) * Ry(pitch) * Rx(roll)
+    """
+    position = [float(args["px"]), float(args["py"]), float(args["pz"])]
+    scale = [float(args["sx"]), float(args["sy"]), float(args["sz"])]
+
+    quaternion = [args.get(name) for name in ("qx", "qy", "qz", "qw")]
+    matrix = [args.get(f"rm{r}{c}") for r in range(3) for c in range(3)]
+    euler = [args.get(name) for name in ("yaw", "pitch", "roll")]
+    use_euler = all(v is not None for v in euler)
+
+    if all(v is not None for v in quaternion):
+        return {"type": "box", "position": position, "scale": scale, "quaternion": [float(v) for v in quaternion]}
+
+    if all(v is not None for v in matrix):
+        matrix = [float(v) for v in matrix]
+        identity = all(abs(matrix[3 * r + c] - (r == c)) <= 1e-6 for r in range(3) for c in range(3))
+        if not (identity and use_euler):
+            # matrixWorld = T * R * S, column-major
+            elements = []
+            for c in range(3):
+                elements += [matrix[3 * c + r] * scale[c] for r in range(3)] + [0.0]
+            return {"type": "box", "matrixWorld": elements + position + [1.0]}
+
+    if use_euler:
+        quaternion = _euler_zyx_to_quaternion(*(math.degrees(float(v)) for v in euler))
+        return {"type": "box", "position": position, "scale": scale, "quaternion": quaternion}
+
+    raise ValueError("pdalVolumeDelete requires a quaternion (qx, qy, qz, qw), rotation matrix "
+                     "(rm00 to rm22) or Euler angles (roll, pitch, yaw)")
+
+
+def _run_volume_delete(args, token):
+    # Box volume içindeki noktaları sil
+    return _run_clip_scene(args, token, _volume_delete_box(args), "outside")
+
+
+def _run_journal_apply(args, token):
+    from pdal_edit_journal import apply_journal
+    return apply_journal(args["i"], args.get("o"), int(args.get("chunk", DEFAULT_CHUNK_SIZE)), token=token)
+
+
+def _run_outlier_removal(args, token):
+    from pdal_outlier_removal import outlier_removal
+    return outlier_removal(args["i"], args["o"], int(args.get("k", 8)), float(args.get("multiplier", 2.0)),
+                           args.get("mode", "delete"), float(args.get("tile", 100.0)), float(args.get("halo", 5.0)),
+                           args.get("workers"), int(args.get("chunk", DEFAULT_CHUNK_SIZE)), token=token)
+
+
+def _run_profile_extract(args, token):
+    from pdal_profile import extract_profile
+    return extract_profile(args["i"], args["o"], args["polyline"], float(args["width"]),
+                           int(args.get("chunk", DEFAULT_CHUNK_SIZE)), token=token)
+
+
+# --run adı -> fonksiyon(args, token)
+COMMANDS = {
+    "elevationRaster": _run_elevation_raster,
+    "rasterMaxZInPolygon": _run_raster_max_z_in_polygon,
+    "maxZInPolygon": _run_max_z_in_polygon,
+    "clipVolumes": _run_clip_volumes,
+    "pdalCrop": _run_crop,
+    "pdalRotatedCrop": _run_rotated_crop,
+    "pdalVolumeDelete": _run_volume_delete,
+    "journalApply": _run_journal_apply,
+    "outlierRemoval": _run_outlier_removal,
+    "profileExtract": _run_profile_extract,
+}
+
+
+def _raster_bytes(args):
+    # Grid memmap'i rastgele hücrelere yazılır - tamamı çalışma kümesinde kalır
+    _, mins, maxs = read_header_bounds(args["i"])
+    rows, cols = grid_shape(mins[0], mins[1], maxs[0], maxs[1], float(args.get("resolution", 1.0)))
+    return rows * cols * 4
+
+
+def _outlier_bytes(args):
+    # Her worker bir tile + halo için KD-tree kurar; tile yoğunluğu header sınırlarından tahmin edilir
+    point_count, mins, maxs = read_header_bounds(args["i"])
+    tile = float(args.get("tile", 100.0))
+    halo = float(args.get("halo", 5.0))
+    k = int(args.get("k", 8))
+    workers = int(args.get("workers") or os.cpu_count() or 1)
+
+    area = max((maxs[0] - mins[0]) * (maxs[1] - mins[1]), tile * tile)
+    tile_points = min(point_count, point_count * (tile + 2 * halo) ** 2 / area)
+    # k + 1 komşu için mesafe (f8) + index (i8)
+    per_point = KDTREE_BYTES_PER_POINT + (k + 1) * 16
+    return workers * tile_points * per_point + point_count * 4
+
+
+# Komut başına zorunlu argümanlar (Job oluşturulurken kontrol edilir)
+REQUIRED_ARGS = {
+    "elevationRaster": ("i", "o"),
+    "rasterMaxZInPolygon": ("raster", "wkt"),
+    "maxZInPolygon": ("i", "wkt"),
+    "clipVolumes": ("i", "o", "scene"),
+    "pdalCrop": ("i", "o", "wkt"),
+    "pdalRotatedCrop": ("i", "o", "cx", "cy", "cz", "sx", "sy", "sz"),
+    "pdalVolumeDelete": ("i", "o", "px", "py", "pz", "sx", "sy", "sz"),
+    "journalApply": ("i",),
+    "outlierRemoval": ("i", "o"),
+    "profileExtract": ("i", "o", "polyline", "width"),
+}
+
+
+# Chunk belleğine eklenen komuta özel bellek (byte)
+EXTRA_MEMORY = {
+    "elevationRaster": _raster_bytes,
+    "outlierRemoval": _outlier_bytes,
+}
+
+
+def estimate_memory_mb(run, args):
+    """
+    İşin bellek ihtiyacı - job'da memory_mb verilmemişse tahmin edilir
+
+    Chunk belleği + komuta özel bellek (elevationRaster grid'i, outlierRemoval
+    KD-tree'leri). Giriş header'ı okunamazsa sadece chunk belleği kullanılır.
+    """
+    chunk = int(args.get("chunk", DEFAULT_CHUNK_SIZE))
+    total = chunk * BYTES_PER_POINT
+    if run in EXTRA_MEMORY:
+        try:
+            total += EXTRA_MEMORY[run](args)
+        except Exception as e:
+            print(f"[INFO]: Memory estimate falls back to chunk size ({run}): {e}", flush=True)
+    return total / (1024 * 1024)
+
+
+class Job:
+    """
+    Kuyruktaki tek bir komut
+
+    Args:
+        job_id: Benzersiz iş kimliği (cancel dosyası adı da bu)
+        run: COMMANDS içindeki komut adı
+        args: Komut argümanları (CLI ile aynı isimler, "--" olmadan)
+        priority: "interactive" veya "batch" (None ise DEFAULT_PRIORITIES, yoksa "batch")
+        memory_mb: Bellek tahmini (None ise estimate_memory_mb ile hesaplanır)
+        cancel_files: Varlığı bu işi iptal eden dosyalar
+    """
+
+    def __init__(self, job_id, run, args, priority=None, memory_mb=None, cancel_files=()):
+        if run not in COMMANDS:
+            raise ValueError(f"Unknown command: {run} (expected one of {sorted(COMMANDS)})")
+        missing = [name for name in REQUIRED_ARGS.get(run, ()) if args.get(name) is None]
+        if missing:
+            raise ValueError(f"Job {job_id}: {run} requires args: {', '.join(missing)}")
+        priority = priority or DEFAULT_PRIORITIES.get(run, "batch")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority} (expected one of {sorted(PRIORITIES)})")
+
+        self.id = job_id
+        self.run = run
+        self.args = args
+        self.priority = priority
+        self.memory_mb = float(memory_mb) if memory_mb else estimate_memory_mb(run, args)
+        self.token = CancelToken(cancel_files)
+        self.status = "queued"
+        self.result = None
+        self.error = None
+
+
+class JobRunner:
+    """
+    Öncelik sıralı, eşzamanlılık ve bellek sınırlı iş çalıştırıcı
+
+    Kuyruğun başındaki iş sığmıyorsa (bellek / iş sayısı) arkasındakiler
+    onu geçmez; büyük export işleri aç kalmaz. Hiç iş çalışmıyorsa bütçeden
+    büyük bir iş de tek başına başlatılır.
+
+    Args:
+        max_jobs: Aynı anda çalışabilecek en fazla iş
+        memory_mb: Çalışan işlerin toplam bellek bütçesi
+    """
+
+    def __init__(self, max_jobs=2, memory_mb=4096):
+        if max_jobs < 1:
+            raise ValueError(f"max_jobs must be at least 1: {max_jobs}")
+        self.max_jobs = max_jobs
+        self.memory_mb = memory_mb
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._jobs = {}
+        self._running = 0
+        self._memory_used = 0.0
+        self._condition = threading.Condition()
+
+    def submit(self, job):
+        with self._condition:
+            heapq.heappush(self._queue, (PRIORITIES[job.priority], next(self._sequence), job))
+            self._jobs[job.id] = job
+            print(f"[INFO]: Job queued: {job.id} ({job.run}, {job.priority}, ~{job.memory_mb:.0f} MB)", flush=True)
+            self._condition.notify_all()
+        return job
+
+    def cancel(self, job_id):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.token.cancel()
+            self._condition.notify_all()
+
+    def cancel_all(self):
+        with self._condition:
+            for job in self._jobs.values():
+                job.token.cancel()
+            self._condition.notify_all()
+
+    def _can_start(self, job):
+        if self._running >= self.max_jobs:
+            return False
+        return self._running == 0 or self._memory_used + job.memory_mb <= self.memory_mb
+
+    def _execute(self, job):
+        try:
+            job.token.check()
+            print(f"[INFO]: Job started: {job.id} ({job.run})", flush=True)
+            job.result = COMMANDS[job.run](job.args, job.token)
+            job.status = "done"
+            print(f"[INFO]: Job finished: {job.id}", flush=True)
+        except JobCancelled:
+            job.status = "cancelled"
+            print(f"[INFO]: Job cancelled: {job.id}", flush=True)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"✗ Job failed: {job.id}: {e}", flush=True)
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._memory_used -= job.memory_mb
+                self._condition.notify_all()
+
+    def run_all(self, poll_interval=0.5):
+        """
+        Kuyruk boşalana ve tüm işler bitene kadar çalıştır
+
+        Returns:
+            {job_id: Job}
+        """
+        # Numba thread havuzu iş thread'lerinden önce bu (ana) thread'de başlatılmalı
+        init_threading()
+
+        threads = []
+        with self._condition:
+            while self._queue or self._running:
+                if self._queue:
+                    job = self._queue[0][2]
+                    # Kuyrukta beklerken iptal edilen iş hiç başlatılmaz
+                    if job.token.cancelled:
+                        heapq.heappop(self._queue)
+                        job.status = "cancelled"
+                        print(f"[INFO]: Job cancelled: {job.id}", flush=True)
+                        continue
+                    if self._can_start(job):
+                        heapq.heappop(self._queue)
+                        self._running += 1
+                        self._memory_used += job.memory_mb
+                        job.status = "running"
+                        thread = threading.Thread(target=self._execute, args=(job,), daemon=True)
+                        threads.append(thread)
+                        thread.start()
+                        continue
+                # Cancel dosyaları da kontrol edilebilsin diye zaman aşımlı bekle
+                self._condition.wait(poll_interval)
+
+        for thread in threads:
+            thread.join()
+        return dict(self._jobs)
+
+
+def _json_value(value):
+    """Komut dönüş değerini JSON'a çevir (tuple -> liste, numpy -> Python, nan / inf -> null)"""
+    if isinstance(value, dict):
+        return {str(key): _json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    if hasattr(value, "item"):
+        # numpy skaler (np.float32, np.int64 ...)
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def load_jobs(jobs_file, cancel_dir=None):
+    """
+    jobs.json dosyasından işleri oku
+
+    Format:
+        [{"id": "crop-1", "run": "elevationRaster", "priority": "batch",
+          "memory_mb": 800, "args": {"i": "...", "o": "...", "resolution": 0.5}}, ...]
+    """
+    with open(jobs_file, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    jobs = []
+    for index, entry in enumerate(entries):
+        job_id = str(entry.get("id", f"job-{index}"))
+        cancel_files = ()
+        if cancel_dir:
+            cancel_files = (os.path.join(cancel_dir, f"{job_id}.cancel"), os.path.join(cancel_dir, "all.cancel"))
+        jobs.append(Job(job_id, entry["run"], entry.get("args", {}), entry.get("priority"),
+                        entry.get("memory_mb"), cancel_files))
+    return jobs
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Job runner - point cloud komutlarını kuyrukla çalıştır")
+    parser.add_argument("--run", required=True, choices=["jobRunner"])
+    parser.add_argument("--jobs", required=True, type=str, help="Jobs JSON file")
+    parser.add_argument("--max-jobs", required=False, type=int, default=2, help="Max concurrent jobs")
+    parser.add_argument("--memory-mb", required=False, type=float, default=4096, help="Memory budget (MB)")
+    parser.add_argument("--cancel-dir", required=False, type=str, help="Directory watched for <job_id>.cancel files")
+
+    args = parser.parse_args()
+
+    runner = JobRunner(args.max_jobs, args.memory_mb)
+    install_signal_handlers(runner.cancel_all)
+
+    for job in load_jobs(args.jobs, args.cancel_dir):
+        runner.submit(job)
+
+    started = time.time()
+    jobs = runner.run_all()
+
+    print("=" * 60)
+    print(f"Jobs finished in {time.time() - started:.1f}s")
+    for job in jobs.values():
+        print(f"  {job.id}: {job.status}" + (f" ({job.error})" if job.error else ""))
+    print("=" * 60)
+
+    print_result(json.dumps({
+        job.id: {"status": job.status, "result": _json_value(job.result), "error": job.error}
+        for job in jobs.values()
+    }))
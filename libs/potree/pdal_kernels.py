@@ -0,0 +1,328 @@
+import os, threading
+import numpy as np
+
+from pdal_stream_utils import print_result
+
+# Box / sphere / polygon testleri ve polygon içi max-Z için opsiyonel Numba kernel'leri.
+#
+# NumPy yolu her test için N x 3 ve N uzunluğunda geçici diziler oluşturur
+# (points - center, matmul, üç np.abs karşılaştırması, & birleşimleri...).
+# Numba kernel'leri noktalar üzerinde tek döngüde, geçici dizi olmadan ve
+# paralel thread'lerle çalışır.
+#
+# Numba yoksa (veya ROTGIS_DISABLE_NUMBA=1 ise) aynı fonksiyonlar NumPy ile çalışır.
+# İki yol aynı ifade sırasını kullanır, böylece sınırdaki noktalar için de
+# maskeler birebir aynıdır (kernelSelfCheck ile doğrulanabilir).
+#
+# Thread'lerden kullanım (örn. JobRunner işleri):
+#   - Numba thread havuzu ilk kez ana thread dışında başlatılırsa process çıkışta
+#     asılı kalır. init_threading() havuzu çağrıldığı thread'de başlatır; JobRunner
+#     bunu işleri başlatmadan önce ana thread'de çağırır.
+#   - workqueue threading layer'ı (TBB / OpenMP yoksa seçilir) eşzamanlı çağrılara
+#     karşı güvenli değildir; kernel çağrıları _KERNEL_LOCK ile sıraya alınır. Her
+#     çağrı zaten tüm çekirdekleri kullanır.
+
+try:
+    if os.environ.get("ROTGIS_DISABLE_NUMBA") == "1":
+        raise ImportError("disabled by ROTGIS_DISABLE_NUMBA")
+    import numba
+    from numba import get_num_threads, njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+_KERNEL_LOCK = threading.Lock()
+
+
+def init_threading():
+    """
+    Numba thread havuzunu bu thread'de başlat (Numba yoksa bir şey yapmaz)
+
+    Kernel'leri kullanacak thread'ler başlatılmadan önce ana thread'den çağrılmalıdır.
+    """
+    if NUMBA_AVAILABLE:
+        get_num_threads()
+
+
+# --------------------------
+# NumPy yolu
+# --------------------------
+
+def _local_axis_numpy(xyz, linear, offset, axis):
+    # Kernel ile aynı sıra: x*l0 + y*l1 + z*l2 + o (matmul/BLAS sırası farklı olabilir)
+    return xyz[:, 0] * linear[axis, 0] + xyz[:, 1] * linear[axis, 1] + xyz[:, 2] * linear[axis, 2] + offset[axis]
+
+
+def box_mask_numpy(xyz, linear, offset):
+    mask = np.ones(len(xyz), dtype=bool)
+    for axis in range(3):
+        mask &= np.abs(_local_axis_numpy(xyz, linear, offset, axis)) <= 0.5
+    return mask
+
+
+def sphere_mask_numpy(xyz, linear, offset):
+    d = np.zeros(len(xyz))
+    for axis in range(3):
+        local = _local_axis_numpy(xyz, linear, offset, axis)
+        d += local * local
+    return d <= 1.0
+
+
+def polygon_mask_numpy(x, y, vx, vy, ring_starts):
+    """Even-odd - delikler dahil tüm ring'ler (delik = çift geçiş)"""
+    inside = np.zeros(len(x), dtype=bool)
+    for r in range(len(ring_starts) - 1):
+        start, end = ring_starts[r], ring_starts[r + 1]
+        j = end - 1
+        for i in range(start, end):
+            xi, yi, xj, yj = vx[i], vy[i], vx[j], vy[j]
+            if yi != yj:
+                crosses = (yi > y) != (yj > y)
+                x_cross = (xj - xi) * (y - yi) / (yj - yi) + xi
+                inside ^= crosses & (x < x_cross)
+            j = i
+    return inside
+
+
+def max_z_in_polygon_numpy(x, y, z, vx, vy, ring_starts):
+    mask = polygon_mask_numpy(x, y, vx, vy, ring_starts)
+    return float(z[mask].max()) if mask.any() else -np.inf
+
+
+# --------------------------
+# Numba yolu
+# --------------------------
+
+if NUMBA_AVAILABLE:
+
+    @njit(parallel=True, cache=True)
+    def _box_mask_numba(xyz, linear, offset):
+        n = xyz.shape[0]
+        mask = np.empty(n, dtype=np.bool_)
+        for k in prange(n):
+            x, y, z = xyz[k, 0], xyz[k, 1], xyz[k, 2]
+            inside = True
+            for axis in range(3):
+                local = x * linear[axis, 0] + y * linear[axis, 1] + z * linear[axis, 2] + offset[axis]
+                # NumPy yolu ile aynı karşılaştırma (NaN dışarıda sayılır)
+                if not abs(local) <= 0.5:
+                    inside = False
+                    break
+            mask[k] = inside
+        return mask
+
+    @njit(parallel=True, cache=True)
+    def _sphere_mask_numba(xyz, linear, offset):
+        n = xyz.shape[0]
+        mask = np.empty(n, dtype=np.bool_)
+        for k in prange(n):
+            x, y, z = xyz[k, 0], xyz[k, 1], xyz[k, 2]
+            d = 0.0
+            for axis in range(3):
+                local = x * linear[axis, 0] + y * linear[axis, 1] + z * linear[axis, 2] + offset[axis]
+                d += local * local
+            mask[k] = d <= 1.0
+        return mask
+
+    @njit(inline="always")
+    def _point_in_rings(px, py, vx, vy, ring_starts):
+        inside = False
+        for r in range(ring_starts.shape[0] - 1):
+            start, end = ring_starts[r], ring_starts[r + 1]
+            j = end - 1
+            for i in range(start, end):
+                xi, yi, xj, yj = vx[i], vy[i], vx[j], vy[j]
+                if yi != yj and (yi > py) != (yj > py):
+                    if px < (xj - xi) * (py - yi) / (yj - yi) + xi:
+                        inside = not inside
+                j = i
+        return inside
+
+    @njit(parallel=True, cache=True)
+    def _polygon_mask_numba(x, y, vx, vy, ring_starts):
+        n = x.shape[0]
+        mask = np.empty(n, dtype=np.bool_)
+        for k in prange(n):
+            mask[k] = _point_in_rings(x[k], y[k], vx, vy, ring_starts)
+        return mask
+
+    @njit(parallel=True, cache=True)
+    def _max_z_in_polygon_numba(x, y, z, vx, vy, ring_starts, blocks):
+        n = x.shape[0]
+        # Thread başına blok - her blok kendi max'ını tutar, sonra birleştirilir.
+        # blocks dışarıdan gelir: kernel içinde get_num_threads() cache=True'yu bozar.
+        partial = np.full(blocks, -np.inf)
+        for b in prange(blocks):
+            start = b * n // blocks
+            end = (b + 1) * n // blocks
+            best = -np.inf
+            for k in range(start, end):
+                if z[k] > best and _point_in_rings(x[k], y[k], vx, vy, ring_starts):
+                    best = z[k]
+            partial[b] = best
+        return partial.max()
+
+
+# --------------------------
+# Ortak arayüz
+# --------------------------
+
+def flatten_polygon(rings):
+    """
+    Tek polygon'un ring'lerini (dış + delikler) kernel formatına çevir
+
+    Returns:
+        (vx, vy, ring_starts) - ring r'nin köşeleri vx[ring_starts[r]:ring_starts[r + 1]]
+    """
+    vertices = np.vstack(rings).astype(np.float64)
+    ring_starts = np.zeros(len(rings) + 1, dtype=np.int64)
+    ring_starts[1:] = np.cumsum([len(ring) for ring in rings])
+    return np.ascontiguousarray(vertices[:, 0]), np.ascontiguousarray(vertices[:, 1]), ring_starts
+
+
+def _use_numba(use_numba):
+    """use_numba None ise Numba varsa kullanılır; True verilip Numba yoksa hata"""
+    if use_numba is None:
+        return NUMBA_AVAILABLE
+    if use_numba and not NUMBA_AVAILABLE:
+        raise ImportError("'numba' library not found! Install it with: pip install numba")
+    return bool(use_numba)
+
+
+def box_mask(xyz, linear, offset, use_numba=None):
+    """Birim box ([-0.5, 0.5]^3) testi: local = linear @ p + offset"""
+    if _use_numba(use_numba):
+        xyz = np.ascontiguousarray(xyz, dtype=np.float64)
+        with _KERNEL_LOCK:
+            return _box_mask_numba(xyz, linear, offset)
+    return box_mask_numpy(xyz, linear, offset)
+
+
+def sphere_mask(xyz, linear, offset, use_numba=None):
+    """Birim sphere (yarıçap 1) testi: local = linear @ p + offset"""
+    if _use_numba(use_numba):
+        xyz = np.ascontiguousarray(xyz, dtype=np.float64)
+        with _KERNEL_LOCK:
+            return _sphere_mask_numba(xyz, linear, offset)
+    return sphere_mask_numpy(xyz, linear, offset)
+
+
+def polygons_mask(x, y, polygons, use_numba=None):
+    """Noktaların polygon(lar) içinde olup olmadığı - parse_wkt_polygons formatı"""
+    use_numba = _use_numba(use_numba)
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    mask = np.zeros(len(x), dtype=bool)
+    for rings in polygons:
+        vx, vy, ring_starts = flatten_polygon(rings)
+        if use_numba:
+            with _KERNEL_LOCK:
+                mask |= _polygon_mask_numba(x, y, vx, vy, ring_starts)
+        else:
+            mask |= polygon_mask_numpy(x, y, vx, vy, ring_starts)
+    return mask
+
+
+def max_z_in_polygons(x, y, z, polygons, use_numba=None):
+    """Polygon(lar) içindeki noktaların maksimum Z'si - içeride nokta yoksa -inf"""
+    use_numba = _use_numba(use_numba)
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    z = np.ascontiguousarray(z, dtype=np.float64)
+    best = -np.inf
+    for rings in polygons:
+        vx, vy, ring_starts = flatten_polygon(rings)
+        if use_numba:
+            blocks = max(1, min(len(x), get_num_threads() * 4))
+            with _KERNEL_LOCK:
+                value = _max_z_in_polygon_numba(x, y, z, vx, vy, ring_starts, blocks)
+        else:
+            value = max_z_in_polygon_numpy(x, y, z, vx, vy, ring_starts)
+        best = max(best, value)
+    return best
+
+
+def self_check(n=1_000_000, seed=0):
+    """
+    Numba ve NumPy yollarının aynı maskeleri verdiğini doğrula
+
+    Rastgele noktalar, sınır noktaları ve NaN noktalar ile döndürülmüş box,
+    elipsoid ve delikli polygon test edilir. Box / sphere sınır noktaları local
+    uzayda yüzeyin üstünde (|local| = 0.5 / |local| = 1) üretilip world'e taşınır;
+    yuvarlama ile yüzeyin iki yanına da düşerler.
+
+    Returns:
+        {test_adı: True/False} - Numba yoksa None (karşılaştırılacak bir şey yok)
+    """
+    if not NUMBA_AVAILABLE:
+        return None
+
+    rng = np.random.default_rng(seed)
+    xyz = rng.uniform(-2.0, 2.0, size=(n, 3))
+
+    angle = 0.3
+    c, s = np.cos(angle), np.sin(angle)
+    linear = np.array([[c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0]]) / np.array([[1.5], [0.8], [1.2]])
+    offset = np.array([0.1, -0.2, 0.05])
+    inverse = np.linalg.inv(linear)
+
+    exterior = np.array([[-1.5, -1.0], [1.5, -1.2], [1.0, 1.5], [-1.2, 1.0]])
+    hole = np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]])
+    polygons = [[exterior, hole]]
+
+    m = max(1, min(n // 8, 10_000))
+    # Box yüzeyleri: bir eksen tam ±0.5, diğerleri yüzey içinde
+    box_local = rng.uniform(-0.5, 0.5, size=(m, 3))
+    box_local[np.arange(m), rng.integers(0, 3, m)] = rng.choice([-0.5, 0.5], m)
+    # Sphere yüzeyi: |local| = 1
+    sphere_local = rng.normal(size=(m, 3))
+    sphere_local /= np.linalg.norm(sphere_local, axis=1, keepdims=True)
+    # Polygon kenarları (dış ring ve delik) ve köşeleri
+    ring = np.vstack([exterior, hole])
+    a = rng.integers(0, len(ring), m)
+    b = np.where(a % 4 == 3, a - 3, a + 1)
+    t = rng.choice([0.0, 0.5, rng.uniform()], m)
+    edge_xy = ring[a] + t[:, None] * (ring[b] - ring[a])
+
+    boundary = np.vstack([(box_local - offset) @ inverse.T, (sphere_local - offset) @ inverse.T,
+                          np.column_stack([edge_xy, rng.uniform(-2.0, 2.0, m)])])
+    boundary = boundary[:n]
+    xyz[:len(boundary)] = boundary
+    # Bozuk (NaN) noktalar - iki yol da dışarıda saymalı
+    xyz[len(boundary):len(boundary) + min(10, n - len(boundary))] = np.nan
+
+    x, y, z = xyz[:, 0], xyz[:, 1], xyz[:, 2]
+    return {
+        "box": bool(np.array_equal(box_mask(xyz, linear, offset, True), box_mask(xyz, linear, offset, False))),
+        "sphere": bool(np.array_equal(sphere_mask(xyz, linear, offset, True),
+                                      sphere_mask(xyz, linear, offset, False))),
+        "polygon": bool(np.array_equal(polygons_mask(x, y, polygons, True), polygons_mask(x, y, polygons, False))),
+        "maxZ": max_z_in_polygons(x, y, z, polygons, True) == max_z_in_polygons(x, y, z, polygons, False),
+    }
+
+
+if __name__ == "__main__":
+    import argparse, json, time
+
+    parser = argparse.ArgumentParser(description="Kernels - Numba / NumPy yollarını karşılaştır")
+    parser.add_argument("--run", required=True, choices=["kernelSelfCheck"])
+    parser.add_argument("--n", required=False, type=int, default=1_000_000, help="Number of random points")
+
+    args = parser.parse_args()
+
+    print(f"Numba available: {NUMBA_AVAILABLE}" + (f" ({numba.__version__}, {get_num_threads()} threads)"
+                                                  if NUMBA_AVAILABLE else ""))
+    started = time.time()
+    results = self_check(args.n)
+    if results is None:
+        # Sessizce "geçti" denmesin - kontrol yapılmadı
+        print("  Skipped: Numba is not available, nothing to compare")
+        print_result(json.dumps({"skipped": True}))
+        raise SystemExit(1)
+    print(f"  Checked {args.n:,} points in {time.time() - started:.2f}s (includes JIT compile)")
+    for name, ok in results.items():
+        print(f"  {name}: {'identical' if ok else 'MISMATCH'}")
+
+    print_result(json.dumps(results))
+    if not all(results.values()):
+        raise SystemExit(1)
@@ -0,0 +1,279 @@
+import math, os, shutil, tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+
+from pdal_stream_utils import (
+    DEFAULT_CHUNK_SIZE,
+    CancelToken,
+    JobCancelled,
+    filter_las,
+    install_signal_handlers,
+    iter_las_chunks,
+    print_progress,
+    read_header_bounds,
+)
+
+# Bu kod, istatistiksel outlier temizliğini (PDAL filters.outlier "statistical" ile aynı
+# yöntem) RAM'den büyük point cloud'larda tile tile yapar.
+#
+#   1) Noktalar XY tile'larına dağıtılır (geçici dosyalara). Tile kenarına halo
+#      mesafesinden yakın noktalar komşu tile'a da "halo" olarak yazılır.
+#   2) Her tile için KD-tree kurulur, tile'ın kendi (core) noktalarının k en yakın
+#      komşusuna ortalama mesafesi hesaplanır. Tile'lar paralel işlenir.
+#   3) Tüm noktalar için: eşik = ortalama + multiplier * standart sapma.
+#      Ortalama mesafesi eşiğin üzerindeki noktalar outlier'dır.
+#   4) İkinci geçişte outlier'lar silinir veya classification = 7 (noise) yazılır.
+#
+# Halo, k. komşu mesafesinden büyük olmalıdır; aksi halde tile kenarındaki noktaların
+# komşuları eksik kalır (mesafeleri biraz büyük çıkar).
+
+MODES = ("delete", "classify")
+
+# ASPRS LAS "Low Point (noise)" sınıfı - PDAL filters.outlier ile aynı
+NOISE_CLASS = 7
+
+TILE_RECORD = np.dtype([("xyz", "f8", 3), ("idx", "i8"), ("core", "?")])
+
+
+def _tile_file(tile_dir, tx, ty):
+    return os.path.join(tile_dir, f"tile_{tx}_{ty}.bin")
+
+
+def _spill_tiles(input_file, tile_dir, origin, tile_size, halo, chunk_size, token):
+    """
+    1. geçiş: noktaları core / halo olarak tile dosyalarına yaz
+
+    Returns:
+        (point_count, {(tx, ty): core_point_count})
+    """
+    core_counts = {}
+    offset = 0
+    point_count = 0
+
+    for chunk, done, total in iter_las_chunks(input_file, chunk_size, label="Tiling points", token=token):
+        point_count = total
+        xyz = np.column_stack([chunk.x, chunk.y, chunk.z])
+        idx = np.arange(offset, offset + len(xyz), dtype=np.int64)
+        offset += len(xyz)
+
+        fx = (xyz[:, 0] - origin[0]) / tile_size
+        fy = (xyz[:, 1] - origin[1]) / tile_size
+        tx = np.floor(fx).astype(np.int64)
+        ty = np.floor(fy).astype(np.int64)
+        # Tile içindeki konum (birim: point cloud)
+        lx = (fx - tx) * tile_size
+        ly = (fy - ty) * tile_size
+
+        near_x = {-1: lx < halo, 0: np.ones(len(xyz), dtype=bool), 1: lx > tile_size - halo}
+        near_y = {-1: ly < halo, 0: np.ones(len(xyz), dtype=bool), 1: ly > tile_size - halo}
+
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                sel = np.flatnonzero(near_x[dx] & near_y[dy])
+                if len(sel) == 0:
+                    continue
+
+                records = np.empty(len(sel), dtype=TILE_RECORD)
+                records["xyz"] = xyz[sel]
+                records["idx"] = idx[sel]
+                records["core"] = (dx == 0 and dy == 0)
+
+                # Tile'a göre grupla, her tile dosyasına tek yazma
+                keys_x = tx[sel] + dx
+                keys_y = ty[sel] + dy
+                order = np.lexsort((keys_y, keys_x))
+                keys = np.column_stack([keys_x[order], keys_y[order]])
+                records = records[order]
+                starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+                bounds = np.concatenate([[0], starts, [len(keys)]])
+
+                for a, b in zip(bounds[:-1], bounds[1:]):
+                    key = (int(keys[a, 0]), int(keys[a, 1]))
+                    with open(_tile_file(tile_dir, *key), "ab") as f:
+                        records[a:b].tofile(f)
+                    if dx == 0 and dy == 0:
+                        core_counts[key] = core_counts.get(key, 0) + (b - a)
+
+    return point_count, core_counts
+
+
+def _tile_mean_distances(tile_file, k, halo, token):
+    """
+    Bir tile'ın core noktaları için k-NN ortalama mesafesi (KD-tree)
+
+    Returns:
+        (idx, mean_distance) - core noktaların global index'i ve ortalama mesafesi
+    """
+    from scipy.spatial import cKDTree
+
+    token.check()
+    records = np.fromfile(tile_file, dtype=TILE_RECORD)
+    core = records["core"]
+    if not core.any():
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    tree = cKDTree(records["xyz"])
+    # k + 1: ilk komşu noktanın kendisi (mesafe 0)
+    distances, _ = tree.query(records["xyz"][core], k=k + 1)
+    neighbors = distances[:, 1:]
+
+    # Tile + halo'da k + 1'den az nokta varsa eksik komşular inf döner. Eksik komşu
+    # tile + halo dışındadır: core noktaya uzaklığı en az halo'dur, ve (k-NN sıralı)
+    # bulunan en uzak komşudan yakın değildir. Ortalamaya bu alt sınır ile girer;
+    # atlanırsa seyrek gürültü kümeleri küçük ortalama alıp tutulur.
+    found = np.isfinite(neighbors)
+    farthest = np.where(found, neighbors, 0.0).max(axis=1)
+    lower_bound = np.maximum(halo, farthest)
+    mean = np.where(found, neighbors, lower_bound[:, None]).mean(axis=1)
+    # halo = 0 iken hiç komşusu bulunmayan nokta için bilgi yok - izole say
+    if halo == 0:
+        mean[~found.any(axis=1)] = np.inf
+    return records["idx"][core], mean
+
+
+def _threshold(mean_distances, multiplier, block=DEFAULT_CHUNK_SIZE):
+    """Eşik = ortalama + multiplier * standart sapma (sonsuz değerler hariç, bloklar halinde)"""
+    total, total_sq, count = 0.0, 0.0, 0
+    for start in range(0, len(mean_distances), block):
+        values = np.asarray(mean_distances[start:start + block], dtype=np.float64)
+        values = values[np.isfinite(values)]
+        total += values.sum()
+        total_sq += (values * values).sum()
+        count += len(values)
+
+    if count == 0:
+        return math.inf, 0.0, 0.0
+    mean = total / count
+    std = math.sqrt(max(0.0, total_sq / count - mean * mean))
+    return mean + multiplier * std, mean, std
+
+
+def outlier_removal(input_file, output_file, k=8, multiplier=2.0, mode="delete", tile_size=100.0, halo=5.0,
+                    workers=None, chunk_size=DEFAULT_CHUNK_SIZE, token=None):
+    """
+    İstatistiksel outlier temizliği - tile + halo + KD-tree
+
+    Args:
+        input_file: Giriş LAS/LAZ dosyası
+        output_file: Çıkış LAS/LAZ dosyası
+        k: Komşu sayısı (PDAL mean_k)
+        multiplier: Standart sapma çarpanı (PDAL multiplier)
+        mode: "delete" (outlier'ları sil) veya "classify" (classification = 7)
+        tile_size: Tile kenar uzunluğu (point cloud birimi)
+        halo: Komşu tile'lardan alınan kenar bandı genişliği
+        workers: Paralel tile sayısı (None = CPU sayısı)
+        chunk_size: Tek seferde okunacak nokta sayısı
+        token: İptal kontrolü için CancelToken (opsiyonel)
+
+    Returns:
+        (points_read, outlier_count)
+    """
+    try:
+        import scipy.spatial  # noqa: F401
+    except ImportError:
+        raise ImportError("'scipy' library not found! Install it with: pip install scipy")
+
+    if mode not in MODES:
+        raise ValueError(f"Unsupported mode: {mode} (expected one of {MODES})")
+    if k < 1:
+        raise ValueError(f"k must be at least 1: {k}")
+    if tile_size <= 0 or halo < 0 or halo >= tile_size / 2:
+        raise ValueError(f"Invalid tiling: tile={tile_size}, halo={halo} (0 <= halo < tile / 2)")
+
+    token = token or CancelToken()
+    workers = workers or os.cpu_count() or 1
+    point_count, mins, maxs = read_header_bounds(input_file)
+
+    print("=" * 60)
+    print("Statistical outlier removal:")
+    print(f"  Input:      {input_file} ({point_count:,} points)")
+    print(f"  k:          {k}, multiplier: {multiplier}")
+    print(f"  Tiles:      {tile_size} (halo {halo}), {workers} worker(s)")
+    print(f"  Mode:       {mode}")
+    print("=" * 60)
+
+    tile_dir = tempfile.mkdtemp(prefix=".outliers_", dir=os.path.dirname(os.path.abspath(output_file)))
+    mean_distances = None
+    try:
+        _, core_counts = _spill_tiles(input_file, tile_dir, mins, tile_size, halo, chunk_size, token)
+
+        mean_distances = np.lib.format.open_memmap(os.path.join(tile_dir, "mean_distances.npy"), mode="w+",
+                                                   dtype=np.float32, shape=(point_count,))
+        mean_distances[:] = np.inf
+
+        # Büyük tile'lar önce - paralel iş sonunda tek bir büyük tile beklenmesin
+        tiles = sorted(core_counts, key=lambda key: -core_counts[key])
+        done = 0
+        # cKDTree sorgusu GIL'i bırakır - thread'ler gerçek paralel çalışır.
+        # Memmap'e sadece bu thread yazar (worker'lar memmap'e referans tutmaz).
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_tile_mean_distances, _tile_file(tile_dir, *key), k, halo, token)
+                       for key in tiles]
+            try:
+                for future in as_completed(futures):
+                    idx, mean = future.result()
+                    mean_distances[idx] = mean
+                    done += len(idx)
+                    print_progress("Computing neighbor distances", 100.0 * done / max(1, point_count))
+            except BaseException:
+                token.cancel()
+                raise
+
+        threshold, mean, std = _threshold(mean_distances, multiplier)
+        print(f"  Mean k-NN distance: {mean:.6f} (std {std:.6f})")
+        print(f"  Threshold:          {threshold:.6f}")
+
+        position = [0]
+        outliers = [0]
+
+        def keep_fn(chunk):
+            start = position[0]
+            position[0] += len(chunk)
+            is_outlier = ~(np.asarray(mean_distances[start:position[0]]) <= threshold)
+            outliers[0] += int(is_outlier.sum())
+            if mode == "delete":
+                return ~is_outlier
+            classification = np.asarray(chunk.classification).copy()
+            classification[is_outlier] = NOISE_CLASS
+            chunk.classification = classification
+            return None
+
+        filter_las(input_file, output_file, keep_fn, chunk_size, label="Writing output", token=token)
+    finally:
+        # Memmap kapatılmadan geçici klasör silinemez (Windows) - hata / iptalde de.
+        # keep_fn memmap'i closure ile tutar; değişkeni sıfırlamak ikisini de bırakır.
+        mean_distances = None
+        shutil.rmtree(tile_dir, ignore_errors=True)
+
+    action = "removed" if mode == "delete" else f"classified as {NOISE_CLASS}"
+    print(f"  Outliers {action}: {outliers[0]:,}")
+    print(f"✓ Outlier removal completed successfully: {output_file}")
+    return point_count, outliers[0]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Outlier removal - tile bazlı istatistiksel outlier temizliği")
+    parser.add_argument("--run", required=True, choices=["outlierRemoval"])
+    parser.add_argument("--i", required=True, type=str, help="Input LAZ file")
+    parser.add_argument("--o", required=True, type=str, help="Output LAZ file")
+    parser.add_argument("--k", required=False, type=int, default=8, help="Number of neighbors (mean_k)")
+    parser.add_argument("--multiplier", required=False, type=float, default=2.0, help="Std deviation multiplier")
+    parser.add_argument("--mode", required=False, type=str, default="delete", choices=MODES)
+    parser.add_argument("--tile", required=False, type=float, default=100.0, help="Tile size")
+    parser.add_argument("--halo", required=False, type=float, default=5.0, help="Tile overlap (halo) width")
+    parser.add_argument("--workers", required=False, type=int, help="Parallel tiles (default: CPU count)")
+    parser.add_argument("--chunk", required=False, type=int, default=DEFAULT_CHUNK_SIZE, help="Points per chunk")
+    parser.add_argument("--cancel", required=False, type=str, help="Cancel file (job is cancelled when it exists)")
+
+    args = parser.parse_args()
+
+    token = CancelToken([args.cancel])
+    install_signal_handlers(token.cancel)
+    try:
+        outlier_removal(args.i, args.o, args.k, args.multiplier, args.mode, args.tile, args.halo,
+                        args.workers, args.chunk, token=token)
+    except JobCancelled:
+        print("[INFO]: Outlier removal cancelled, partial output removed")
+        raise SystemExit(1)
@@ -0,0 +1,250 @@
+import json, os, re
+import numpy as np
+
+from pdal_stream_utils import (
+    DEFAULT_CHUNK_SIZE,
+    CancelToken,
+    JobCancelled,
+    atomic_output,
+    install_signal_handlers,
+    iter_las_chunks,
+)
+
+# Bu kod, bir polyline boyunca verilen genişlikteki koridordaki noktaları tam
+# yoğunlukta çıkarır ve station / offset koordinatlarına projekte eder (kesit / profil).
+#
+#   station: polyline başlangıcından itibaren polyline üzerindeki mesafe
+#   offset:  polyline'a dik işaretli mesafe (sol +, sağ -)
+#
+# Point cloud tek geçişte, chunk chunk okunur; bellek kullanımı chunk_size ile sınırlıdır.
+# Her chunk önce koridorun AABB'si, sonra her segmentin (genişletilmiş) AABB'si ile elenir.
+#
+# Çıktı:
+#   .csv: station,offset,x,y,z,intensity,classification
+#   .bin: PROFILE_RECORD kayıtları (little-endian, sıralı değil) + "<çıktı>.json" açıklaması
+
+PROFILE_RECORD = np.dtype([
+    ("station", "<f8"), ("offset", "<f8"),
+    ("x", "<f8"), ("y", "<f8"), ("z", "<f8"),
+    ("intensity", "<u2"), ("classification", "u1"),
+])
+
+
+def parse_polyline(polyline):
+    """
+    Polyline'ı (N, 2) diziye çevir ve doğrula
+
+    Kabul edilen formatlar: "LINESTRING(x y, x y, ...)", "x y, x y, ..." veya
+    JSON [[x, y], ...] metni ya da [[x, y], ...] liste / dizi (varsa Z yok sayılır)
+    """
+    if isinstance(polyline, str):
+        text = polyline.strip().strip('"').strip()
+        if text.startswith("["):
+            vertices = [p[:2] for p in json.loads(text)]
+        else:
+            match = re.match(r"^LINESTRING\s*(Z|M|ZM)?\s*\((.*)\)$", text, re.IGNORECASE | re.DOTALL)
+            body = match.group(2) if match else text
+            vertices = [[float(v) for v in pair.split()[:2]] for pair in body.split(",") if pair.strip()]
+    else:
+        vertices = [p[:2] for p in polyline]
+
+    polyline = np.asarray(vertices, dtype=np.float64)
+    if polyline.ndim != 2 or len(polyline) < 2 or polyline.shape[1] != 2:
+        raise ValueError("Polyline must have at least 2 vertices with x and y")
+    if not np.isfinite(polyline).all():
+        raise ValueError("Polyline vertices must be finite")
+
+    # Tekrarlanan ardışık köşeleri at (sıfır uzunluklu segment)
+    keep = np.concatenate([[True], np.any(np.diff(polyline, axis=0) != 0, axis=1)])
+    polyline = polyline[keep]
+    if len(polyline) < 2:
+        raise ValueError("Polyline has zero length")
+    return polyline
+
+
+class Corridor:
+    """
+    Polyline + genişlik - noktaları station / offset'e projekte eder
+
+    Bir nokta birden fazla segmentin koridoruna düşerse (köşelerde) polyline'a
+    en yakın segment kullanılır. İlk segmentin başından ve son segmentin
+    sonundan taşan noktalar koridora dahil değildir.
+    """
+
+    def __init__(self, polyline, width):
+        if width <= 0:
+            raise ValueError(f"Corridor width must be positive: {width}")
+        self.polyline = polyline
+        self.half_width = width / 2.0
+
+        self.a = polyline[:-1]
+        self.d = polyline[1:] - polyline[:-1]
+        self.length = np.hypot(self.d[:, 0], self.d[:, 1])
+        self.start_station = np.concatenate([[0.0], np.cumsum(self.length)[:-1]])
+        self.total_length = float(self.length.sum())
+
+        hw = self.half_width
+        self.seg_min = np.minimum(polyline[:-1], polyline[1:]) - hw
+        self.seg_max = np.maximum(polyline[:-1], polyline[1:]) + hw
+        self.aabb_min = self.seg_min.min(axis=0)
+        self.aabb_max = self.seg_max.max(axis=0)
+
+    def project(self, x, y):
+        """
+        Returns:
+            (indices, station, offset) - sadece koridordaki noktalar
+        """
+        n = len(x)
+        best_dist = np.full(n, np.inf)
+        station = np.empty(n)
+        offset = np.empty(n)
+        last = len(self.length) - 1
+
+        for s in range(len(self.length)):
+            smin, smax = self.seg_min[s], self.seg_max[s]
+            idx = np.flatnonzero((x >= smin[0]) & (x <= smax[0]) & (y >= smin[1]) & (y <= smax[1]))
+            if len(idx) == 0:
+                continue
+
+            ax, ay = self.a[s]
+            dx, dy = self.d[s]
+            length = self.length[s]
+            px = x[idx] - ax
+            py = y[idx] - ay
+
+            along = (px * dx + py * dy) / length
+            across = (dx * py - dy * px) / length
+
+            # Uç segmentlerde koridor polyline'ın başında / sonunda kesilir
+            lo = 0.0 if s == 0 else -np.inf
+            hi = length if s == last else np.inf
+            valid = (along >= lo) & (along <= hi)
+
+            # Ara köşelerde projeksiyon segmente sıkıştırılır, mesafe köşeye göre ölçülür
+            clamped = np.clip(along, 0.0, length)
+            dist = np.hypot(along - clamped, across)
+            better = valid & (dist <= self.half_width) & (dist < best_dist[idx])
+
+            sel = idx[better]
+            best_dist[sel] = dist[better]
+            station[sel] = self.start_station[s] + clamped[better]
+            offset[sel] = across[better]
+
+        inside = np.flatnonzero(np.isfinite(best_dist))
+        return inside, station[inside], offset[inside]
+
+
+def _chunk_records(chunk, corridor):
+    x = np.asarray(chunk.x)
+    y = np.asarray(chunk.y)
+
+    # Koridor AABB ön elemesi
+    cmin, cmax = corridor.aabb_min, corridor.aabb_max
+    candidates = np.flatnonzero((x >= cmin[0]) & (x <= cmax[0]) & (y >= cmin[1]) & (y <= cmax[1]))
+    if len(candidates) == 0:
+        return None
+
+    inside, station, offset = corridor.project(x[candidates], y[candidates])
+    if len(inside) == 0:
+        return None
+    sel = candidates[inside]
+
+    records = np.empty(len(sel), dtype=PROFILE_RECORD)
+    records["station"] = station
+    records["offset"] = offset
+    records["x"] = x[sel]
+    records["y"] = y[sel]
+    records["z"] = np.asarray(chunk.z)[sel]
+    records["intensity"] = np.asarray(chunk.intensity)[sel]
+    records["classification"] = np.asarray(chunk.classification)[sel]
+    return records
+
+
+def extract_profile(input_file, output_file, polyline, width, chunk_size=DEFAULT_CHUNK_SIZE, token=None):
+    """
+    Polyline koridorundaki noktaları tek geçişte profile çıkar
+
+    Args:
+        input_file: Giriş LAS/LAZ dosyası
+        output_file: Çıkış dosyası (.csv veya .bin)
+        polyline: parse_polyline formatında metin veya [[x, y], ...] liste / dizi
+        width: Koridor genişliği (polyline'ın iki yanına width / 2)
+        chunk_size: Tek seferde okunacak nokta sayısı
+        token: İptal kontrolü için CancelToken (opsiyonel)
+
+    Returns:
+        Profile'a yazılan nokta sayısı
+    """
+    extension = os.path.splitext(output_file)[1].lower()
+    if extension not in (".csv", ".bin"):
+        raise ValueError(f"Unsupported output format: {extension} (expected .csv or .bin)")
+
+    # Liste / dizi girişleri de (örn. JobRunner JSON'u) aynı doğrulamadan geçer
+    corridor = Corridor(parse_polyline(polyline), width)
+
+    print("=" * 60)
+    print("Profile extraction:")
+    print(f"  Input:    {input_file}")
+    print(f"  Polyline: {len(corridor.polyline)} vertices, {corridor.total_length:.3f} long")
+    print(f"  Width:    {width}")
+    print("=" * 60)
+
+    count = 0
+    station_range = [np.inf, -np.inf]
+    with atomic_output(output_file) as tmp:
+        with open(tmp, "w" if extension == ".csv" else "wb") as f:
+            if extension == ".csv":
+                f.write(",".join(PROFILE_RECORD.names) + "\n")
+
+            for chunk, done, total in iter_las_chunks(input_file, chunk_size, label="Extracting profile", token=token):
+                records = _chunk_records(chunk, corridor)
+                if records is None:
+                    continue
+                count += len(records)
+                station_range[0] = min(station_range[0], float(records["station"].min()))
+                station_range[1] = max(station_range[1], float(records["station"].max()))
+
+                if extension == ".csv":
+                    np.savetxt(f, records, delimiter=",", fmt=["%.4f", "%.4f", "%.4f", "%.4f", "%.4f", "%d", "%d"])
+                else:
+                    records.tofile(f)
+
+    if extension == ".bin":
+        description = {
+            "fields": [[name, PROFILE_RECORD[name].str] for name in PROFILE_RECORD.names],
+            "count": count,
+            "length": corridor.total_length,
+            "width": width,
+            "stationRange": station_range if count else None,
+            "polyline": corridor.polyline.tolist(),
+        }
+        with atomic_output(output_file + ".json") as tmp:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(description, f, indent=2)
+
+    print(f"  Profile points: {count:,}")
+    print(f"✓ Profile extracted successfully: {output_file}")
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile - polyline koridorundan tam yoğunlukta kesit çıkar")
+    parser.add_argument("--run", required=True, choices=["profileExtract"])
+    parser.add_argument("--i", required=True, type=str, help="Input LAZ file")
+    parser.add_argument("--o", required=True, type=str, help="Output profile (.csv or .bin)")
+    parser.add_argument("--polyline", required=True, type=str, help="LINESTRING WKT, 'x y, x y, ...' or JSON")
+    parser.add_argument("--width", required=True, type=float, help="Corridor width")
+    parser.add_argument("--chunk", required=False, type=int, default=DEFAULT_CHUNK_SIZE, help="Points per chunk")
+    parser.add_argument("--cancel", required=False, type=str, help="Cancel file (job is cancelled when it exists)")
+
+    args = parser.parse_args()
+
+    token = CancelToken([args.cancel])
+    install_signal_handlers(token.cancel)
+    try:
+        extract_profile(args.i, args.o, args.polyline, args.width, args.chunk, token=token)
+    except JobCancelled:
+        print("[INFO]: Profile extraction cancelled, partial output removed")
+        raise SystemExit(1)
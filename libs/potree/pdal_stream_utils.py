@@ -0,0 +1,280 @@
+import math, os, re, signal, threading
+from contextlib import contextmanager
+import numpy as np
+
+# Büyük LAS/LAZ dosyalarını parça parça (chunk) işleyen komutlar için ortak yardımcılar.
+# Çıktı formatı ShellCommandService'in beklediği gibidir:
+#   [INFO]: mesaj [PROGRESS]: 52.20
+#   [RESULT]: 123.456
+
+DEFAULT_CHUNK_SIZE = 2_000_000
+
+
+def print_progress(message, percentage):
+    """ShellCommandService'in parse ettiği formatta ilerleme yazdır"""
+    print(f"[INFO]: {message} [PROGRESS]: {percentage:.2f}", flush=True)
+
+
+def print_result(value):
+    """getMaxZInPolygon vb. çağrıların okuduğu sonucu yazdır"""
+    print(f"[RESULT]: {value}", flush=True)
+
+
+# --------------------------
+# İptal (cancellation) ve atomik çıktı
+# --------------------------
+# Process'i öldürmek yarım yazılmış LAZ dosyaları bırakır. Bunun yerine komutlar
+# her chunk arasında token.check() çağırır; iptal edildiyse JobCancelled fırlatılır
+# ve atomic_output geçici dosyayı siler. Hedef dosya ya tam yazılmıştır ya hiç yoktur.
+
+class JobCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    """
+    Chunk'lar arasında kontrol edilen iptal bayrağı
+
+    Args:
+        cancel_files: Varlığı iptal anlamına gelen dosyalar (Electron tarafı
+            process'i öldürmek yerine bu dosyayı oluşturur)
+    """
+
+    def __init__(self, cancel_files=()):
+        self._event = threading.Event()
+        self.cancel_files = [f for f in cancel_files if f]
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        if not self._event.is_set() and any(os.path.exists(f) for f in self.cancel_files):
+            self._event.set()
+        return self._event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled("Job cancelled")
+
+
+def install_signal_handlers(callback):
+    """SIGINT / SIGTERM (Windows'ta SIGBREAK) geldiğinde process'i öldürmek yerine iptal et"""
+    for name in ("SIGINT", "SIGTERM", "SIGBREAK"):
+        sig = getattr(signal, name, None)
+        if sig is not None:
+            signal.signal(sig, lambda signum, frame: callback())
+
+
+def partial_path(output_file):
+    """Geçici çıktı yolu - uzantı korunur (laspy .laz/.las'a göre sıkıştırma seçer)"""
+    directory, name = os.path.split(output_file)
+    stem, extension = os.path.splitext(name)
+    return os.path.join(directory, f".{stem}.partial{extension}")
+
+
+@contextmanager
+def atomic_output(output_file):
+    """
+    Çıktıyı geçici dosyaya yazdır, başarıda yerine taşı (os.replace)
+
+    Hata veya iptalde geçici dosya silinir, hedef dosyaya dokunulmaz.
+
+        with atomic_output(args.o) as tmp:
+            write(tmp)
+    """
+    tmp = partial_path(output_file)
+    try:
+        yield tmp
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, output_file)
+
+
+def read_header_bounds(input_file):
+    """
+    LAS header'dan nokta sayısını ve sınırları oku (noktaları okumadan)
+
+    Returns:
+        (point_count, mins, maxs) - mins/maxs: np.array([x, y, z])
+    """
+    import laspy
+
+    with laspy.open(input_file) as reader:
+        header = reader.header
+        return header.point_count, np.array(header.mins), np.array(header.maxs)
+
+
+def iter_las_chunks(input_file, chunk_size=DEFAULT_CHUNK_SIZE, label="Reading points", token=None):
+    """
+    LAS/LAZ dosyasını tek geçişte chunk chunk oku
+
+    Her chunk laspy ScaleAwarePointRecord'dur (x, y, z ve diğer boyutlar).
+    Bellek kullanımı chunk_size ile sınırlıdır, dosya boyutundan bağımsızdır.
+    token verilirse her chunk'tan önce iptal kontrolü yapılır.
+
+    Yields:
+        (chunk, points_done, point_count)
+    """
+    import laspy
+
+    with laspy.open(input_file) as reader:
+        point_count = reader.header.point_count
+        done = 0
+        for chunk in reader.chunk_iterator(chunk_size):
+            if token is not None:
+                token.check()
+            done += len(chunk)
+            yield chunk, done, point_count
+            if point_count > 0:
+                print_progress(label, 100.0 * done / point_count)
+
+
+def filter_las(input_file, output_file, keep_fn, chunk_size=DEFAULT_CHUNK_SIZE, label="Filtering points", token=None):
+    """
+    LAS/LAZ dosyasını tek geçişte filtreleyip yaz
+
+    Tüm nokta boyutları (intensity, classification, RGB, extra bytes ...) korunur;
+    header'daki nokta sayısı ve sınırlar laspy tarafından kapanışta güncellenir.
+
+    Args:
+        keep_fn: chunk -> bool maske (True = noktayı tut). None dönerse chunk
+            olduğu gibi yazılır (örn. sadece classification güncelleyen komutlar).
+
+    Returns:
+        (points_read, points_written)
+    """
+    import laspy
+
+    read, written = 0, 0
+    with atomic_output(output_file) as tmp:
+        with laspy.open(input_file) as reader:
+            with laspy.open(tmp, mode="w", header=reader.header) as writer:
+                point_count = reader.header.point_count
+                for chunk in reader.chunk_iterator(chunk_size):
+                    if token is not None:
+                        token.check()
+                    keep = keep_fn(chunk)
+                    if keep is None:
+                        writer.write_points(chunk)
+                        written += len(chunk)
+                    else:
+                        if keep.any():
+                            writer.write_points(chunk[keep])
+                        written += int(np.count_nonzero(keep))
+                    read += len(chunk)
+                    if point_count > 0:
+                        print_progress(label, 100.0 * read / point_count)
+    return read, written
+
+
+# --------------------------
+# WKT polygon
+# --------------------------
+# Potree / OpenLayers tarafından gelen WKT: POLYGON((x y, x y, ...), (delik ...))
+# veya MULTIPOLYGON(((...)), ((...))). Z değeri varsa yok sayılır.
+
+def _parse_ring(text):
+    coords = []
+    for pair in text.split(","):
+        values = pair.split()
+        if len(values) < 2:
+            continue
+        coords.append((float(values[0]), float(values[1])))
+    ring = np.array(coords, dtype=np.float64)
+    if len(ring) < 3:
+        raise ValueError(f"Polygon ring must have at least 3 vertices: {text!r}")
+    # Kapalı ring ise son noktayı at (kenar döngüsü zaten kapatıyor)
+    if np.allclose(ring[0], ring[-1]):
+        ring = ring[:-1]
+    return ring
+
+
+def _split_groups(text):
+    """Üst seviyedeki parantez gruplarının içeriğini döndür: "(a),(b)" -> ["a", "b"]"""
+    groups, depth, start = [], 0, None
+    for i, ch in enumerate(text):
+        if ch == "(":
+            if depth == 0:
+                start = i + 1
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                groups.append(text[start:i])
+    return groups
+
+
+def parse_wkt_polygons(wkt):
+    """
+    WKT POLYGON / MULTIPOLYGON metnini ring listelerine çevir
+
+    Returns:
+        [[exterior, hole1, ...], ...] - her ring (N, 2) np.array
+    """
+    text = wkt.strip().strip('"').strip()
+    match = re.match(r"^(MULTIPOLYGON|POLYGON)\s*(Z|M|ZM)?\s*\((.*)\)$", text, re.IGNORECASE | re.DOTALL)
+    if not match:
+        raise ValueError(f"Unsupported WKT geometry (POLYGON/MULTIPOLYGON expected): {wkt[:64]}")
+
+    kind, body = match.group(1).upper(), match.group(3)
+    if kind == "POLYGON":
+        polygon_bodies = [body]
+    else:
+        polygon_bodies = _split_groups(body)
+
+    polygons = []
+    for polygon_body in polygon_bodies:
+        rings = [_parse_ring(r) for r in _split_groups(polygon_body)]
+        if rings:
+            polygons.append(rings)
+
+    if not polygons:
+        raise ValueError(f"WKT contains no polygon rings: {wkt[:64]}")
+    return polygons
+
+
+def polygons_bounds(polygons):
+    """Polygon listesinin 2D sınırları: (xmin, ymin, xmax, ymax)"""
+    exteriors = np.vstack([rings[0] for rings in polygons])
+    xmin, ymin = exteriors.min(axis=0)
+    xmax, ymax = exteriors.max(axis=0)
+    return xmin, ymin, xmax, ymax
+
+
+def points_in_ring(x, y, ring):
+    """
+    Even-odd ray casting - kenarlar üzerinde döngü, noktalar üzerinde vektörel
+
+    Kenar sayısı genelde küçük, nokta sayısı büyük olduğu için
+    döngü kenarlar üzerinde yapılır.
+    """
+    inside = np.zeros(len(x), dtype=bool)
+    xj, yj = ring[-1]
+    for xi, yi in ring:
+        if yi != yj:
+            crosses = (yi > y) != (yj > y)
+            x_cross = (xj - xi) * (y - yi) / (yj - yi) + xi
+            inside ^= crosses & (x < x_cross)
+        xj, yj = xi, yi
+    return inside
+
+
+def points_in_polygons(x, y, polygons):
+    """Noktaların polygon(lar) içinde olup olmadığı - delikler hariç"""
+    mask = np.zeros(len(x), dtype=bool)
+    for rings in polygons:
+        inside = points_in_ring(x, y, rings[0])
+        for hole in rings[1:]:
+            inside &= ~points_in_ring(x, y, hole)
+        mask |= inside
+    return mask
+
+
+def grid_shape(xmin, ymin, xmax, ymax, resolution):
+    """Verilen sınırları kaplayan grid boyutu: (rows, cols)"""
+    cols = max(1, int(math.floor((xmax - xmin) / resolution)) + 1)
+    rows = max(1, int(math.floor((ymax - ymin) / resolution)) + 1)
+    return rows, cols
@@ -501,6 +501,75 @@ class PotreeService {
     }
   }
 
+  /**
+   * Describe all clip volumes of the scene (boxes, spheres, polygon prisms and the
+   * clipping tool's screen polygons) for the `clipVolumes` command, which applies
+   * the whole set in a single pass
+   * @returns Scene object, or null if there are no clip volumes or the clip task
+   * is NONE / HIGHLIGHT (nothing to apply)
+   */
+  static getClipVolumeScene() {
+    if (!window.viewer || !window.viewer.scene) {
+      return null;
+    }
+
+    const volumes = [];
+
+    for (const volume of window.viewer.scene.volumes) {
+      if (!volume.clip) continue;
+
+      volume.updateMatrixWorld(true);
+
+      if (volume instanceof window.Potree.BoxVolume) {
+        volumes.push({ type: "box", matrixWorld: Array.from(volume.matrixWorld.elements) });
+      } else if (volume instanceof window.Potree.SphereVolume) {
+        volumes.push({ type: "sphere", matrixWorld: Array.from(volume.matrixWorld.elements) });
+      } else if (Array.isArray(volume.points) && volume.height) {
+        // PolygonVolume: XY polygon extruded from its lowest vertex
+        const zmin = Math.min(...volume.points.map((p: any) => p.z));
+        volumes.push({
+          type: "polygon",
+          points: volume.points.map((p: any) => [p.x, p.y]),
+          zmin: zmin,
+          zmax: zmin + volume.height,
+        });
+      }
+    }
+
+    // Clipping tool polygons are drawn in screen space: NDC markers plus the
+    // view-projection of the camera they were drawn with (as in the point shader)
+    for (const polygon of window.viewer.scene.polygonClipVolumes || []) {
+      if (!polygon.initialized) continue;
+
+      const viewProjection = polygon.projMatrix.clone().multiply(polygon.viewMatrix);
+      volumes.push({
+        type: "screenPolygon",
+        points: polygon.markers.map((m: any) => [m.position.x, m.position.y]),
+        viewProjection: Array.from(viewProjection.elements),
+      });
+    }
+
+    if (volumes.length === 0) {
+      return null;
+    }
+
+    // Only SHOW_INSIDE / SHOW_OUTSIDE remove points; NONE and HIGHLIGHT only display
+    const task = window.viewer.getClipTask();
+    let clipTask: "inside" | "outside";
+    if (task === window.Potree.ClipTask.SHOW_INSIDE) {
+      clipTask = "inside";
+    } else if (task === window.Potree.ClipTask.SHOW_OUTSIDE) {
+      clipTask = "outside";
+    } else {
+      return null;
+    }
+
+    const clipMethod =
+      window.viewer.getClipMethod() === window.Potree.ClipMethod.INSIDE_ALL ? "all" : "any";
+
+    return { clipTask, clipMethod, volumes };
+  }
+
   static setMouseConfigurations(
     zoomButton?: number,
     rotateButton?: number,
@@ -646,24 +715,37 @@ class PotreeService {
     return "success";
   }
 
-  static async getMaxZInPolygon(source: string, wkt: string) {
+  /**
+   * Max Z inside a polygon. When a max-Z raster of the point cloud exists
+   * (elevationRaster command) it is answered from the raster instead of a point scan.
+   */
+  static async getMaxZInPolygon(source: string, wkt: string, raster: string | null = null) {
     try {
-      const options = [
-        { name: "--run", value: "pdalMaxZInPolygon" },
-        { name: "--i", value: source },
-        { name: "--wkt", value: `"${wkt}"` },
-      ];
+      const options = raster
+        ? [
+            { name: "--run", value: "rasterMaxZInPolygon" },
+            { name: "--raster", value: `"${raster}"` },
+            { name: "--wkt", value: `"${wkt}"` },
+          ]
+        : [
+            { name: "--run", value: "pdalMaxZInPolygon" },
+            { name: "--i", value: source },
+            { name: "--wkt", value: `"${wkt}"` },
+          ];
       console.error(options);
 
       // TO DO: get max z in polygon
 
       const text = "[RESULT]: 123.456"; // Dummy result
 
-      const match = text.match(/\[RESULT\]:\s*([\d.]+)/);
+      const match = text.match(/\[RESULT\]:\s*(-?[\d.]+)/);
 
-      const result = match ? parseFloat(match[1]) : null;
+      // "[RESULT]: nan" - no points / filled cells inside the polygon
+      if (!match) {
+        return null;
+      }
 
-      return Number(result);
+      return parseFloat(match[1]);
     } catch (error) {
       console.error(error);
       return 1;